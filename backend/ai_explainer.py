@@ -1,10 +1,13 @@
 from google import genai
-import json
 import os
+import asyncio
 import hashlib
 
 from dotenv import load_dotenv
 
+from explain_cache import ExplainCache
+from singleflight import SingleFlight
+
 # ---------------- CONFIG ----------------
 BASE_DIR = os.path.dirname(__file__)
 CACHE_PATH = os.path.join(BASE_DIR, "explain_cache.json")
@@ -20,55 +23,47 @@ if not GEMINI_API_KEY:
 client = genai.Client(api_key=GEMINI_API_KEY)
 
 # ---------------- CACHE HELPERS ----------------
-def load_cache():
-    if not os.path.exists(CACHE_PATH):
-        return {}
-    with open(CACHE_PATH, "r") as f:
-        return json.load(f)
-
-def save_cache(cache):
-    with open(CACHE_PATH, "w") as f:
-        json.dump(cache, f, indent=2)
+# LRU in memory + SQLite on disk; the old JSON file is imported once
+cache = ExplainCache(legacy_path=CACHE_PATH)
 
 def make_cache_key(text: str, mode: str) -> str:
     raw = f"{mode}:{text}"
     return hashlib.sha256(raw.encode()).hexdigest()
 
 # ---------------- MAIN EXPLAIN ----------------
-def explain_article(text: str, mode: str) -> str:
-    if not text or not text.strip():
-        return "No content to explain."
+# identical concurrent requests share one Gemini call
+inflight = SingleFlight()
 
-    cache = load_cache()
-    cache_key = make_cache_key(text, mode)
-
-    # ✅ RETURN FROM CACHE
-    if cache_key in cache:
-        print("⚡ CACHE HIT:", mode)
-        return cache[cache_key]
-
-    print("🧠 GEMINI CALL:", mode)
 
+def build_prompt(text: str, mode: str) -> str:
     if mode == "kid":
-        prompt = f"Explain like I am 5 years old:\n{text}"
+        return f"Explain like I am 5 years old:\n{text}"
     elif mode == "hinglish":
-        prompt = f"Explain in simple Hinglish (Hindi + English):\n{text}"
+        return f"Explain in simple Hinglish (Hindi + English):\n{text}"
     elif mode == "bullets":
-        prompt = f"Explain in short bullet points:\n{text}"
-    else:
-        prompt = text
+        return f"Explain in short bullet points:\n{text}"
+    return text
+
+
+def _generate_explanation(text: str, mode: str, cache_key: str) -> str:
+    # a leader that just finished may have filled it while we waited;
+    # the caller already counted this miss
+    cached = cache.get(cache_key, count=False)
+    if cached is not None:
+        return cached
+
+    print("🧠 GEMINI CALL:", mode)
 
     try:
         response = client.models.generate_content(
             model="models/gemini-flash-latest",
-            contents=prompt
+            contents=build_prompt(text, mode)
         )
 
         result = response.text.strip()
 
         # ✅ SAVE TO CACHE
-        cache[cache_key] = result
-        save_cache(cache)
+        cache.set(cache_key, result)
 
         return result
 
@@ -77,7 +72,73 @@ def explain_article(text: str, mode: str) -> str:
         return "⚠️ AI explanation failed."
 
 
-def summarize_for_newspaper(title, content="", source=""):
+def explain_article(text: str, mode: str) -> str:
+    if not text or not text.strip():
+        return "No content to explain."
+
+    cache_key = make_cache_key(text, mode)
+
+    # ✅ RETURN FROM CACHE
+    cached = cache.get(cache_key)
+    if cached is not None:
+        print("⚡ CACHE HIT:", mode)
+        return cached
+
+    return inflight.do(cache_key, _generate_explanation, text, mode, cache_key)
+
+
+async def stream_explanation(text: str, mode: str):
+    """
+    Async generator of explanation text chunks.
+    Cache hit -> one chunk straight away. Miss -> chunks as Gemini
+    streams them, and the full text is cached once the stream ends.
+    """
+    if not text or not text.strip():
+        yield "No content to explain."
+        return
+
+    cache_key = make_cache_key(text, mode)
+
+    cached = await asyncio.to_thread(cache.get, cache_key)
+    if cached is not None:
+        print("⚡ CACHE HIT:", mode)
+        yield cached
+        return
+
+    print("🧠 GEMINI STREAM:", mode)
+
+    parts = []
+    try:
+        stream = await client.aio.models.generate_content_stream(
+            model="models/gemini-flash-latest",
+            contents=build_prompt(text, mode)
+        )
+        async for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+
+    except Exception as e:
+        print("❌ Gemini error:", e)
+        if not parts:
+            yield "⚠️ AI explanation failed."
+        return
+
+    result = "".join(parts).strip()
+    if result:
+        await asyncio.to_thread(cache.set, cache_key, result)
+
+
+def explain_stats() -> dict:
+    return {
+        **cache.stats(),
+        "coalesced": inflight.coalesced,
+        "in_flight": inflight.in_flight(),
+    }
+
+
+def summarize_for_newspaper(title, content="", source="", llm=None):
+    """`llm` lets callers pass their own genai-style client (e.g. a stub)."""
     prompt = f"""
 You are a professional newspaper editor.
 
@@ -104,7 +165,7 @@ Article Content (may be incomplete):
 Write the final newspaper summary:
 """
 
-    response = client.models.generate_content(
+    response = (llm or client).models.generate_content(
         model="models/gemini-flash-latest",
         contents=prompt
     )
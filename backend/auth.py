@@ -1,23 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
-from jose import jwt
-from sqlalchemy.orm import Session
+from jose import jwt, JWTError
+from cachetools import TTLCache
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session, defer
 from fastapi.security import OAuth2PasswordBearer
 from database import SessionLocal
 from models import User
 from schemas import SignupRequest, AuthRequest  # 🔴 IMPORTANT
 from schemas import ArticleRequest
 from models import Article
-from models import UserPreference, UserNewspaper
+from models import UserNewspaper
+from personalization import build_user_newspaper
+from preference_buffer import preference_buffer
+import os
 import json
+import asyncio
+import time
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from datetime import date
 router = APIRouter()
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET = "dev_secret"
 ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# ======================
+# PASSWORDS
+# ======================
+# bcrypt is CPU heavy: run it on a small dedicated pool and await it, so
+# a login storm queues there instead of parking request threads
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+
+pwd = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+password_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.wrap_future(password_pool.submit(pwd.hash, password))
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.wrap_future(password_pool.submit(pwd.verify, password, hashed))
+
+
+# ======================
+# TOKENS
+# ======================
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))  # seconds
+_token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+_token_lock = threading.Lock()
+
+
+def decode_token(token: str) -> dict:
+    """jwt.decode with a short-lived cache of verified claims."""
+    with _token_lock:
+        claims = _token_cache.get(token)
+    if claims is not None and claims.get("exp", float("inf")) > time.time():
+        return claims
+
+    try:
+        claims = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    with _token_lock:
+        _token_cache[token] = claims
+    return claims
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    return decode_token(token)
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -30,9 +89,15 @@ def get_db():
 # SIGNUP
 # ======================
 @router.post("/signup")
-def signup(data: SignupRequest, db: Session = Depends(get_db)):
+async def signup(data: SignupRequest, db: Session = Depends(get_db)):
+    # DB calls go to the threadpool: a commit waiting on the SQLite lock
+    # must not stall the event loop; only the bcrypt future is awaited here
+
     # 1️⃣ Check if user already exists
-    if db.query(User).filter(User.email == data.email).first():
+    existing = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == data.email).first()
+    )
+    if existing:
         raise HTTPException(status_code=400, detail="User exists")
 
     # 2️⃣ Validate role
@@ -42,13 +107,16 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
     # 3️⃣ Create user
     user = User(
         email=data.email,
-        password=pwd.hash(data.password),
+        password=await hash_password(data.password),
         role=data.role
     )
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    def save():
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+
+    await run_in_threadpool(save)
 
     return {"msg": "Account created"}
 
@@ -59,13 +127,15 @@ def signup(data: SignupRequest, db: Session = Depends(get_db)):
 from fastapi.security import OAuth2PasswordRequestForm
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == form_data.username).first()
+    )
 
-    if not user or not pwd.verify(form_data.password, user.password):
+    if not user or not await verify_password(form_data.password, user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = jwt.encode(
@@ -82,12 +152,9 @@ def login(
 @router.post("/blogger/article")
 def create_article(
     data: ArticleRequest,
-    token: str = Depends(oauth2_scheme),
+    payload: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # 🔓 Decode JWT
-    payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
-
     # 🔒 Blogger-only access
     if payload.get("role") != "blogger":
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -106,54 +173,92 @@ def create_article(
     db.refresh(article)
 
     return {"msg": "Article published"}
+def _article_json(a, include_content=True):
+    out = {
+        "id": a.id,
+        "title": a.title,
+        "summary": a.summary,
+        "category": a.category,
+        "author": a.author_email,
+        "created_at": a.created_at.isoformat(),
+        "source": a.source
+    }
+    if include_content:
+        out["content"] = a.content
+    return out
+
+
+def _encode_cursor(a):
+    raw = f"{a.created_at.isoformat()}|{a.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(article_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/blogger/articles")
-def get_blogger_articles(db: Session = Depends(get_db)):
+def get_blogger_articles(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None, description="X-Next-Cursor from the previous page"),
+    category: str = Query(None),
+    author: str = Query(None),
+    include_content: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """Newest first, keyset-paged on (created_at, id).
+    The next page's cursor comes back in the X-Next-Cursor header."""
+    q = db.query(Article)
+
+    if category:
+        q = q.filter(Article.category == category)
+    if author:
+        q = q.filter(Article.author_email == author)
+    if cursor:
+        created_at, article_id = _decode_cursor(cursor)
+        q = q.filter(or_(
+            Article.created_at < created_at,
+            and_(Article.created_at == created_at, Article.id < article_id)
+        ))
+    if not include_content:
+        q = q.options(defer(Article.content))
+
     articles = (
-        db.query(Article)
-        .order_by(Article.created_at.desc())
+        q.order_by(Article.created_at.desc(), Article.id.desc())
+        .limit(limit + 1)
         .all()
     )
 
-    return [
-        {
-            "id": a.id,
-            "title": a.title,
-            "summary": a.summary,
-            "content": a.content,
-            "category": a.category,
-            "author": a.author_email,
-            "created_at": a.created_at.isoformat(),
-            "source": a.source
-        }
-        for a in articles
-    ]
-
-def update_user_preference(db, user_email, category, weight=1):
-    pref = (
-        db.query(UserPreference)
-        .filter_by(user_email=user_email, category=category)
-        .first()
-    )
+    if len(articles) > limit:
+        articles = articles[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(articles[-1])
 
-    if pref:
-        pref.score += weight
-    else:
-        pref = UserPreference(
-            user_email=user_email,
-            category=category,
-            score=weight
-        )
-        db.add(pref)
+    return [_article_json(a, include_content) for a in articles]
+
+
+@router.get("/blogger/articles/{article_id}")
+def get_blogger_article(article_id: int, db: Session = Depends(get_db)):
+    article = db.get(Article, article_id)
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return _article_json(article)
 
-    db.commit()
+
+def update_user_preference(user_email, category, weight=1):
+    # buffered; written in batches by preference_buffer
+    preference_buffer.add(user_email, category, weight)
 
 
 @router.post("/newspaper/build")
 def build_newspaper(
-    token: str = Depends(oauth2_scheme),
+    payload: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
     email = payload["sub"]
 
     today = date.today().isoformat()
@@ -168,51 +273,19 @@ def build_newspaper(
     if existing:
         return {"msg": "Newspaper already generated today"}
 
-    # 1️⃣ Get user preferences
-    prefs = (
-        db.query(UserPreference)
-        .filter_by(user_email=email)
-        .order_by(UserPreference.score.desc())
-        .all()
-    )
-
-    if not prefs:
+    # normally prebuilt after summarization; build now if it wasn't
+    if not build_user_newspaper(db, email, today):
         return {"msg": "No preferences yet"}
 
-    # 2️⃣ Fetch summarized news
-    from storage import load_json
-    news = load_json("summarized_news.json")
-
-    picked = []
-    seen = set()
-
-    for p in prefs:
-        for n in news:
-            if n["category"] == p.category and n["title"] not in seen:
-                picked.append(n)
-                seen.add(n["title"])
-            if len(picked) >= 12:
-                break
-
-    paper = UserNewspaper(
-        user_email=email,
-        date=today,
-        articles_json=json.dumps(picked)
-    )
-
-    db.add(paper)
-    db.commit()
-
     return {"msg": "Personalized newspaper created"}
 
 
 
 @router.get("/newspaper")
 def get_my_newspaper(
-    token: str = Depends(oauth2_scheme),
+    payload: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
     email = payload["sub"]
 
     paper = (
@@ -231,30 +304,11 @@ def get_my_newspaper(
 @router.post("/track")
 def track_preference(
     category: str,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    payload: dict = Depends(get_current_user)
 ):
-    payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
     email = payload["sub"]
 
     print("📌 TRACK HIT:", email, category)  # 👈 ADD THIS
 
-    pref = (
-        db.query(UserPreference)
-        .filter_by(user_email=email, category=category)
-        .first()
-    )
-
-    if pref:
-        pref.score += 1
-    else:
-        pref = UserPreference(
-            user_email=email,
-            category=category,
-            score=1
-        )
-        db.add(pref)
-
-    db.commit()
+    update_user_preference(email, category)
     return {"msg": "Preference updated"}
-
@@ -1,31 +1,43 @@
-from fastapi import FastAPI, BackgroundTasks, Body, Query, HTTPException
+from fastapi import FastAPI, BackgroundTasks, Body, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import os, uuid, json, tempfile, requests, re
-from xml.sax.saxutils import escape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
-from PIL import Image as PILImage
-from io import BytesIO
+import os, json, re, asyncio, time
+from contextlib import asynccontextmanager
 from auth import router as auth_router
-from database import engine, Base
+from database import engine, Base, run_migrations
 import models
 
 from news_fetcher import fetch_all_sources
-from storage import save_json, load_json
-from summarizer import categorize
-from ai_explainer import explain_article
+from storage import (
+    upsert_articles, load_articles, count_articles, iter_changed, count_changed,
+    search_articles, RAW, SUMMARIZED,
+)
+from news_cache import news_cache
+from summarizer import classify_batch
+from pdf_renderer import newspaper_path, render_newspaper, cleanup_pdfs, get_pool, shutdown_pool
+from ai_explainer import explain_article, explain_stats, stream_explanation
+from llm_summarizer import LLM_SUMMARIES, LLM_BUDGET, LLM_DEADLINE, summarize_articles
+from personalization import build_daily_newspapers
+from preference_buffer import preference_buffer
+from scheduler import PipelineScheduler
 from voice import router as voice_router
 from auth import router as auth_router
 
-TEMP_DIR = tempfile.gettempdir()
-
 # ---------------- APP ----------------
-app = FastAPI(title="News AI API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preference_buffer.start()
+    pipeline.start()
+    yield
+    pipeline.stop()
+    shutdown_pool()
+    preference_buffer.stop()  # flushes buffered preference writes
+
+
+app = FastAPI(title="News AI API", lifespan=lifespan)
 Base.metadata.create_all(bind=engine)
+run_migrations()
 
 app.include_router(auth_router)
 
@@ -39,17 +51,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-Offset", "X-Next-Cursor"],
 )
 
 
 print("🔥 backend.py loaded")
 
 # ---------------- FETCH ----------------
+def run_fetch():
+    articles, feed_state = fetch_all_sources()
+    changed = upsert_articles(RAW, articles, feed_state=feed_state)
+    return {"count": len(articles), "new_or_updated": changed}
+
+
 @app.post("/fetch")
 def fetch_articles():
-    articles = fetch_all_sources()
-    save_json("news_output.json", articles)
-    return {"status": "fetched", "count": len(articles)}
+    # goes through the pipeline lock so it never overlaps a summarize run
+    ran, results = pipeline.run(["fetch"])
+    if not ran:
+        return {"status": "busy", "pipeline": pipeline.status()}
+    if "fetch" not in results:
+        raise HTTPException(500, pipeline.status()["last_error"])
+    return {"status": "fetched", **results["fetch"]}
 
 # ---------------- LEAD SENTENCE LOGIC ----------------
 def extract_lead_sentences(content: str, max_sentences=2) -> str:
@@ -104,13 +127,44 @@ def get_newspaper_summary(article: dict) -> str:
 
 
 # ---------------- SUMMARIZE ----------------
-def run_summarization():
-    articles = load_json("news_output.json")
-    summarized = []
+SUMMARIZE_BATCH = 200
+CLUSTER_FIELDS = ("cluster_size", "related_urls", "related_sources")
+
+# progress of the current / last run, polled via GET /summarize/status
+summary_status = {
+    "state": "idle",        # idle | queued | running | done | failed
+    "total": 0,             # new or changed articles this run
+    "processed": 0,
+    "skipped": 0,           # unchanged since the last run
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+}
+
+
+def _summarize_batch(articles, llm_usage, llm_until):
+    # optional Gemini pass; falls back to the lead-sentence heuristic
+    if LLM_SUMMARIES:
+        newspaper_summaries, from_llm = summarize_articles(
+            articles,
+            fallback=get_newspaper_summary,
+            budget=max(0, LLM_BUDGET - llm_usage.get("calls", 0)),
+            deadline=llm_until - time.monotonic(),
+            usage=llm_usage,
+        )
+        # "fallback" rows missed the LLM budget/deadline and are retried
+        summary_sources = ["llm" if used else "fallback" for used in from_llm]
+    else:
+        newspaper_summaries = [get_newspaper_summary(a) for a in articles]
+        summary_sources = ["heuristic"] * len(articles)
 
-    for article in articles:
-        newspaper_summary = get_newspaper_summary(article)
+    # one classifier pass over the whole batch
+    categories = classify_batch(articles)
 
+    summarized = []
+    for article, newspaper_summary, summary_source, category in zip(
+        articles, newspaper_summaries, summary_sources, categories
+    ):
         summarized.append({
             "source": article.get("source"),
             "title": article.get("title"),
@@ -121,141 +175,198 @@ def run_summarization():
             "description": article.get("description"),
             "content": article.get("content"),
             "newspaper_summary": newspaper_summary,
-            "category": categorize(article)
+            "summary_source": summary_source,
+            "category": category,
+            # set by dedupe when several sources carried the story
+            **{k: article[k] for k in CLUSTER_FIELDS if k in article},
         })
+    return summarized
+
+
+def run_summarization():
+    """
+    Incremental: only raw articles that are new or whose content hash
+    changed since they were last summarized are processed, in batches,
+    and merged into the summarized store. Articles that only got the
+    fallback summary because the LLM budget ran out are retried next run.
+    Called through `pipeline`, which makes sure only one run is active.
+    """
+    try:
+        total = count_changed(RAW, SUMMARIZED)
+        summary_status.update(
+            state="running",
+            total=total,
+            processed=0,
+            skipped=count_articles(RAW) - total,
+            started_at=time.time(),
+            finished_at=None,
+            error=None,
+        )
+
+        llm_usage = {}
+        llm_until = time.monotonic() + LLM_DEADLINE
+
+        for chunk in iter_changed(RAW, SUMMARIZED, SUMMARIZE_BATCH):
+            articles = [a for a, _, _ in chunk]
+            summarized = _summarize_batch(articles, llm_usage, llm_until)
+            upsert_articles(
+                SUMMARIZED,
+                summarized,
+                positions=[pos for _, pos, _ in chunk],
+                # no source hash -> iter_changed offers the row again next run
+                source_hashes=[
+                    None if item["summary_source"] == "fallback" else h
+                    for item, (_, _, h) in zip(summarized, chunk)
+                ],
+            )
+            summary_status["processed"] += len(chunk)
+
+        news_cache.refresh()
+        print("✅ Summarized:", summary_status["processed"], "skipped:", summary_status["skipped"])
+
+        summary_status.update(state="done", finished_at=time.time())
+
+    except Exception as e:
+        summary_status.update(state="failed", finished_at=time.time(), error=str(e))
+        raise
+
+    # precompute today's personalized papers while we're here; the
+    # summaries are already merged, so a failure here is only logged
+    try:
+        build_daily_newspapers()
+    except Exception as e:
+        print("❌ Daily newspapers failed:", e)
 
-    save_json("summarized_news.json", summarized)
-    print("✅ Summarized:", len(summarized))
 
 @app.post("/summarize")
 def summarize(background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_summarization)
-    return {"status": "started"}
+    if summary_status["state"] == "running":
+        return {"status": "running", "progress": summary_status}
+    # runs now, or right after whatever holds the pipeline (e.g. a /fetch)
+    summary_status["state"] = "queued"
+    background_tasks.add_task(pipeline.run, ["summarize"], queue=True)
+    return {"status": "queued" if pipeline.busy else "started", "progress": summary_status}
 
-# ---------------- DATA ----------------
-@app.get("/news")
-def get_news(limit: int = 200):
-    return load_json("summarized_news.json")[:limit]
 
-# ---------------- IMAGE HELPER ----------------
-def download_image(url):
-    try:
-        if not url:
-            return None
+@app.get("/summarize/status")
+def get_summarize_status():
+    return summary_status
 
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "image/*"
-        }
 
-        r = requests.get(url, headers=headers, timeout=8)
-        if r.status_code != 200:
-            return None
+# ---------------- PIPELINE ----------------
+# fetch -> summarize every PIPELINE_INTERVAL seconds (+/- jitter)
+pipeline = PipelineScheduler([
+    ("fetch", run_fetch),
+    ("summarize", run_summarization),
+])
 
-        if not r.headers.get("Content-Type", "").startswith("image/"):
-            return None
 
-        image = PILImage.open(BytesIO(r.content)).convert("RGB")
+@app.get("/pipeline/status")
+def get_pipeline_status():
+    return {**pipeline.status(), "summarize": summary_status}
 
-        path = os.path.join(TEMP_DIR, f"{uuid.uuid4().hex}.jpg")
-        image.save(path, "JPEG", quality=85)
+# ---------------- DATA ----------------
+def _project(items, fields, keep=()):
+    """Only the comma separated `fields` of each article (all if empty)."""
+    if not fields:
+        return items
+    keys = [f.strip() for f in fields.split(",") if f.strip()] + list(keep)
+    return [{k: a.get(k) for k in keys} for a in items]
 
-        return path
 
-    except Exception:
-        return None
-@app.get("/news/category")
-def get_news_by_category(category: str = Query(...)):
-    from storage import load_json
+def _news_page(request: Request, limit: int, offset: int, fields, category=None):
+    """
+    Paged feed response shared by /news and /news/category.
+    - ETag is the corpus version, so unchanged polls get a bodyless 304
+    - `fields` projects each article (e.g. "title,summary,image")
+    - next page offset + total go in X-Next-Offset / X-Total-Count
+    """
+    snap = news_cache.get()
+    etag = f'"news-{snap.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
 
-    news = load_json("summarized_news.json")
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
 
-    filtered = [
-        n for n in news
-        if n.get("category") == category
-    ]
+    items = snap.page(offset, limit, category)
+    if items is None:
+        items = load_articles(SUMMARIZED, limit=limit, offset=offset, category=category)
+    total = snap.total(category)
 
-    return filtered
-# ---------------- PDF ----------------
-@app.post("/newspaper/pdf")
-async def generate_newspaper_pdf(payload: dict):
-    articles = payload.get("articles", [])
-    date = payload.get("date", "Today")
+    items = _project(items, fields)
 
-    if not articles:
-        raise HTTPException(400, "No articles provided")
+    headers["X-Total-Count"] = str(total)
+    if offset + len(items) < total:
+        headers["X-Next-Offset"] = str(offset + len(items))
 
-    file_name = f"newspaper_{uuid.uuid4().hex}.pdf"
-    base = os.path.dirname(__file__)
-    pdf_dir = os.path.join(base, "generated_pdfs")
-    os.makedirs(pdf_dir, exist_ok=True)
-    path = os.path.join(pdf_dir, file_name)
+    return JSONResponse(content=items, headers=headers)
 
-    doc = SimpleDocTemplate(
-        path,
-        pagesize=A4,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40
-    )
 
-    styles = getSampleStyleSheet()
-    story = []
+@app.get("/news")
+def get_news(
+    request: Request,
+    limit: int = Query(200, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    fields: str = Query(None, description="comma separated, e.g. title,summary,image"),
+):
+    return _news_page(request, limit, offset, fields)
 
-    story.append(Paragraph("<b>AI Daily Newspaper</b>", styles["Title"]))
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph(f"<i>{date}</i>", styles["Normal"]))
-    story.append(Spacer(1, 0.4 * inch))
+@app.get("/news/category")
+def get_news_by_category(
+    request: Request,
+    category: str = Query(...),
+    limit: int = Query(200, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    fields: str = Query(None, description="comma separated, e.g. title,summary,image"),
+):
+    return _news_page(request, limit, offset, fields, category=category)
 
-    temp_images = []
 
-    for idx, article in enumerate(articles, start=1):
-        title_text = article.get("title", "No title")
+@app.get("/news/search")
+def search_news(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: str = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: str = Query(None, description="comma separated, e.g. title,summary,image"),
+):
+    """Best match first. Each result carries a `snippet` with the matched
+    words in <mark>...</mark>; paging headers are the same as /news."""
+    total, items = search_articles(q, limit=limit, offset=offset, category=category)
 
-        summary_text = (
-                article.get("newspaper_summary")
-                or article.get("summary")
-                or ""
-        )
+    headers = {"X-Total-Count": str(total)}
+    if offset + len(items) < total:
+        headers["X-Next-Offset"] = str(offset + len(items))
 
-        # 🔒 FINAL GUARANTEE: NEVER EMPTY IN PDF
-        if not summary_text or len(summary_text.strip()) < 60:
-            headline_core = title_text.split(":")[0]
-            summary_text = (
-                f"{headline_core}. "
-                f"The report outlines recent developments and key facts "
-                f"as reported by {article.get('source') or 'the news outlet'}."
-            )
+    return JSONResponse(content=_project(items, fields, keep=("snippet",)), headers=headers)
+# ---------------- PDF ----------------
+def _log_cleanup(fut):
+    if not fut.cancelled() and fut.exception() is not None:
+        print("❌ PDF cleanup failed:", fut.exception())
 
-        story.append(
-            Paragraph(f"<b>{idx}. {escape(title_text)}</b>", styles["Heading2"])
-        )
-        story.append(Spacer(1, 10))
-
-        img_path = download_image(article.get("image"))
-        if img_path and os.path.exists(img_path):
-            try:
-                story.append(Image(img_path, width=5 * inch, height=3 * inch))
-                story.append(Spacer(1, 12))
-                temp_images.append(img_path)
-            except:
-                pass
-
-        story.append(
-            Paragraph(escape(summary_text), styles["BodyText"])
-        )
-        story.append(Spacer(1, 25))
 
-    doc.build(story)
+@app.post("/newspaper/pdf")
+async def generate_newspaper_pdf(payload: dict):
+    articles = payload.get("articles", [])
+    date = payload.get("date", "Today")
+
+    if not articles:
+        raise HTTPException(400, "No articles provided")
 
-    for img in temp_images:
-        try:
-            os.remove(img)
-        except:
-            pass
+    # same (articles, date) -> same file, rendered once
+    path = newspaper_path(articles, date)
+    loop = asyncio.get_running_loop()
 
-    if os.path.getsize(path) < 1000:
+    try:
+        os.utime(path)  # keeps popular papers away from the janitor
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        # never rendered, or the janitor removed it just now
+        await loop.run_in_executor(get_pool(), render_newspaper, articles, date, path)
+        size = os.path.getsize(path)
+        loop.run_in_executor(None, cleanup_pdfs).add_done_callback(_log_cleanup)
+
+    if size < 1000:
         raise HTTPException(500, "PDF generation failed")
 
     return FileResponse(
@@ -264,6 +375,7 @@ async def generate_newspaper_pdf(payload: dict):
         filename="today_newspaper.pdf"
     )
 
+
 # ---------------- EXPLAIN ----------------
 class ExplainRequest(BaseModel):
     text: str
@@ -274,3 +386,28 @@ def explain(
     body: ExplainRequest = Body(...)
 ):
     return {"result": explain_article(body.text, mode)}
+
+
+@app.post("/explain/stream")
+async def explain_stream(
+    mode: str = Query(..., description="kid | hinglish | bullets"),
+    body: ExplainRequest = Body(...)
+):
+    """Same as /explain, but sent as Server-Sent Events while Gemini writes:
+    `data: {"text": "..."}` per chunk, then `event: done`."""
+
+    async def events():
+        async for chunk in stream_explanation(body.text, mode):
+            yield f"data: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/explain/stats")
+def get_explain_stats():
+    return explain_stats()
@@ -0,0 +1,56 @@
+"""
+Per-page parse + select time of each installed HTML backend.
+
+    python bench_parsers.py [rounds]
+
+Runs over the pages in fixtures/html/: synthetic listing/article pages
+(generated filler text, not copies of real sites) shaped like the
+sources.json sites, with the selectors the scraper would use for them.
+"""
+import os
+import sys
+import time
+
+from html_parser import BACKENDS, load_backend, SiteSelectors
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+# fixture -> which SiteSelectors extraction to time
+FIXTURES = {
+    "listing.html": "hrefs",
+    "article.html": "paragraphs",
+}
+SITE = {
+    "name": "fixture",
+    "selectors": {"links": "div.card-body a", "content": "div.storyBody p"},
+}
+
+
+def bench(backend, html, extract, rounds):
+    selectors = SiteSelectors(SITE, backend)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        found = getattr(selectors, extract)(backend.parse(html))
+    return (time.perf_counter() - start) / rounds, len(found)
+
+
+def main(rounds=200):
+    pages = {}
+    for name in FIXTURES:
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            pages[name] = f.read()
+
+    print(f"{'backend':<12}{'fixture':<16}{'ms/page':>10}{'matches':>10}")
+    for backend_name in BACKENDS:
+        try:
+            backend = load_backend(backend_name)
+        except ImportError:
+            print(f"{backend_name:<12}(not installed)")
+            continue
+        for name, extract in FIXTURES.items():
+            per_page, found = bench(backend, pages[name], extract, rounds)
+            print(f"{backend_name:<12}{name:<16}{per_page * 1000:>10.3f}{found:>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
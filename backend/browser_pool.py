@@ -0,0 +1,145 @@
+import os
+import queue
+import atexit
+import threading
+from concurrent.futures import Future, TimeoutError
+
+# ---------------- CONFIG ----------------
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))      # relaunch after this many pages
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") != "0"
+BROWSER_TIMEOUT_MS = int(os.getenv("BROWSER_TIMEOUT_MS", "30000"))
+BROWSER_WAIT_UNTIL = os.getenv("BROWSER_WAIT_UNTIL", "domcontentloaded")
+# how long a caller waits for its page, queueing included
+FETCH_TIMEOUT = BROWSER_TIMEOUT_MS / 1000 + 15
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# we only need the HTML, not what it points at
+BLOCKED_RESOURCES = {"image", "font", "media"}
+
+
+def _block_heavy(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+class BrowserPool:
+    """
+    A few long-lived Chromium instances shared by all scraper jobs.
+
+    Playwright's sync API is tied to the thread that started it, so each
+    browser lives on its own worker thread and jobs are handed over through
+    a queue. Every page gets a fresh context (no shared cookies/storage),
+    and a browser is relaunched after `max_pages` pages to cap its memory.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 headless=BROWSER_HEADLESS):
+        self.size = size
+        self.max_pages = max_pages
+        self.headless = headless
+
+        self._jobs = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    # ---------- public ----------
+    def fetch(self, url, timeout=FETCH_TIMEOUT) -> str:
+        """Rendered HTML of `url`. Blocks until a browser has loaded it
+        (raises TimeoutError after `timeout` seconds)."""
+        self._ensure_started()
+        fut = Future()
+        self._jobs.put((url, fut))
+        try:
+            return fut.result(timeout)
+        except TimeoutError:
+            fut.cancel()  # still queued -> workers skip it
+            raise
+
+    def stop(self):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(None)
+        for t in threads:
+            t.join(timeout=10)
+
+    # ---------- workers ----------
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.size):
+                t = threading.Thread(target=self._worker, name=f"browser-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _launch(self, p):
+        return p.chromium.launch(headless=self.headless)
+
+    def _render(self, browser, url):
+        context = browser.new_context(user_agent=USER_AGENT)
+        try:
+            context.route("**/*", _block_heavy)
+            page = context.new_page()
+            page.goto(url, timeout=BROWSER_TIMEOUT_MS, wait_until=BROWSER_WAIT_UNTIL)
+            page.wait_for_selector("body")
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")  # load lazy content
+            return page.content()
+        finally:
+            context.close()
+
+    def _next_job(self):
+        """Next (url, future) to work on, or None when stopping."""
+        while True:
+            job = self._jobs.get()
+            if job is None or job[1].set_running_or_notify_cancel():
+                return job
+
+    def _worker(self):
+        try:
+            # imported here so static-only crawls don't need playwright installed
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                self._serve(p)
+        except Exception as e:
+            print("❌ Browser worker failed:", e)
+            # fail jobs instead of leaving callers waiting forever
+            while (job := self._next_job()) is not None:
+                job[1].set_exception(e)
+
+    def _serve(self, p):
+        browser = None
+        pages = 0
+        try:
+            while (job := self._next_job()) is not None:
+                url, fut = job
+                try:
+                    if browser is not None and (pages >= self.max_pages or not browser.is_connected()):
+                        old, browser = browser, None
+                        try:
+                            old.close()
+                        except Exception:
+                            pass
+                    if browser is None:
+                        browser = self._launch(p)
+                        pages = 0
+                    pages += 1
+                    fut.set_result(self._render(browser, url))
+                except Exception as e:
+                    fut.set_exception(e)
+        finally:
+            if browser is not None:
+                browser.close()
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.stop)
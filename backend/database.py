@@ -1,16 +1,113 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "users.db")
 
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+# DATABASE_URL=postgresql://... switches to Postgres
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",        # readers don't block the writer
+    "synchronous": "NORMAL",      # safe with WAL, far fewer fsyncs
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+    "foreign_keys": "ON",
+    "cache_size": -20000,         # ~20 MB page cache
+    "temp_store": "MEMORY",
+}
+
+
+def make_engine(url=DATABASE_URL):
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+        )
+
+    kwargs = {
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": DB_BUSY_TIMEOUT_MS / 1000,
+        }
+    }
+    # in-memory databases use a single shared connection
+    if ":memory:" not in url and url != "sqlite://":
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    sqlite_engine = create_engine(url, **kwargs)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = make_engine()
 
 SessionLocal = sessionmaker(bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def run_migrations():
+    """Bring an existing database up to the current models
+    (create_all only creates missing tables, not new indexes)."""
+    import models  # noqa: F401  registers the tables on Base
+
+    with engine.begin() as conn:
+        # merge duplicate (user, category) rows before the unique index
+        conn.execute(text("""
+            UPDATE user_preferences
+            SET score = (
+                SELECT SUM(p2.score) FROM user_preferences p2
+                WHERE p2.user_email = user_preferences.user_email
+                  AND p2.category = user_preferences.category
+            )
+            WHERE id IN (
+                SELECT MIN(id) FROM user_preferences
+                GROUP BY user_email, category HAVING COUNT(*) > 1
+            )
+        """))
+        conn.execute(text("""
+            DELETE FROM user_preferences
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM user_preferences
+                GROUP BY user_email, category
+            )
+        """))
+
+    with engine.begin() as conn:
+        # keep the first paper of each (user, day) before the unique index
+        conn.execute(text("""
+            DELETE FROM user_newspapers
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM user_newspapers
+                GROUP BY user_email, date
+            )
+        """))
+        # replaced by uq_user_newspapers_email_date
+        conn.execute(text("DROP INDEX IF EXISTS ix_user_newspapers_email_date"))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
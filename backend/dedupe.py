@@ -0,0 +1,119 @@
+import re
+import random
+import hashlib
+from collections import defaultdict
+
+from html_text import visible_text
+
+# MinHash signature length = BANDS * ROWS. With 16 bands of 4 rows,
+# pairs around 0.75 Jaccard become candidates almost always, pairs
+# around 0.4 about a third of the time (and then fail THRESHOLD).
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+# candidates must agree on at least this share of signature slots
+THRESHOLD = 0.75
+
+SHINGLE_SIZE = 3
+
+_WORD = re.compile(r"\w+")
+
+# fixed seed: the same article always gets the same signature
+_rng = random.Random(20240101)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+
+# ---------------- SIGNATURES ----------------
+def _text(article):
+    # visible words only: feed markup and links make unrelated posts look alike
+    return f"{article.get('title') or ''} {visible_text(article.get('content'))}".lower()
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """Word k-grams; very short texts fall back to single words."""
+    words = _WORD.findall(text)
+    if len(words) < k * 3:
+        return set(words)
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash64(s):
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingle_set):
+    hashes = [_hash64(s) for s in shingle_set]
+    if not hashes:
+        return None
+    return tuple(min(h ^ m for h in hashes) for m in _MASKS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+# ---------------- CLUSTERING ----------------
+def cluster(articles, threshold=THRESHOLD):
+    """
+    Group near-duplicate articles with MinHash + LSH banding.
+    Only articles sharing a band bucket are compared, so this is roughly
+    linear in the number of articles. Returns lists of indices, each
+    list sorted, clusters ordered by their first member.
+    """
+    sigs = [minhash(shingles(_text(a))) for a in articles]
+
+    parent = list(range(len(articles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = defaultdict(list)
+    for i, sig in enumerate(sigs):
+        if sig is None:
+            continue
+        for b in range(BANDS):
+            buckets[(b, sig[b * ROWS:(b + 1) * ROWS])].append(i)
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        first = members[0]
+        for other in members[1:]:
+            pair = (first, other)
+            if pair in checked:
+                continue
+            checked.add(pair)
+            ra, rb = find(first), find(other)
+            if ra != rb and similarity(sigs[first], sigs[other]) >= threshold:
+                parent[max(ra, rb)] = min(ra, rb)
+
+    groups = defaultdict(list)
+    for i in range(len(articles)):
+        groups[find(i)].append(i)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+
+def collapse_duplicates(articles, threshold=THRESHOLD):
+    """
+    One canonical article per story.
+    The representative is the member with the most content (earliest
+    source wins ties), kept at the position of the story's first copy.
+    Other copies' URLs and sources are listed on it.
+    """
+    out = []
+    for group in cluster(articles, threshold):
+        best = max(group, key=lambda i: (len(articles[i].get("content") or ""), -i))
+        canonical = dict(articles[best])
+        if len(group) > 1:
+            others = [articles[i] for i in group if i != best]
+            canonical["cluster_size"] = len(group)
+            canonical["related_urls"] = [a.get("url") for a in others if a.get("url")]
+            canonical["related_sources"] = sorted({a.get("source") for a in others if a.get("source")})
+        out.append(canonical)
+    return out
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from storage import get_connection
+
+EXPLAIN_CACHE_SIZE = int(os.getenv("EXPLAIN_CACHE_SIZE", "2000"))           # in-memory entries
+EXPLAIN_CACHE_TTL = float(os.getenv("EXPLAIN_CACHE_TTL", str(30 * 86400)))  # seconds, 0 = forever
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS explain_cache (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+# expired rows are purged from disk every this many writes
+PURGE_EVERY = 200
+
+
+class ExplainCache:
+    """
+    LRU in memory, SQLite (news.db) on disk.
+    - hits from memory are a dict lookup under a lock
+    - misses fall through to one indexed row read
+    - every write is its own small transaction, so parallel requests
+      can't overwrite each other's entries
+    """
+
+    def __init__(self, max_items=EXPLAIN_CACHE_SIZE, ttl=EXPLAIN_CACHE_TTL, legacy_path=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._mem = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._ready = False
+        self._init_lock = threading.Lock()
+        self._legacy_path = legacy_path
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------- disk ----------
+    def _conn(self):
+        conn = get_connection()
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.execute(SCHEMA)
+                    conn.commit()
+                    self._import_legacy(conn)
+                    self._ready = True
+        return conn
+
+    def _import_legacy(self, conn):
+        path = self._legacy_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                old = json.load(f)
+        except ValueError:
+            return
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO explain_cache (key, value, created_at) VALUES (?, ?, ?)",
+                [(k, v, now) for k, v in old.items()],
+            )
+        os.replace(path, path + ".imported")
+        print(f"📦 Imported {len(old)} explanations from {path}")
+
+    def _expired(self, created_at):
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    # ---------- memory ----------
+    def _remember(self, key, value, created_at):
+        # caller holds self._lock
+        self._mem[key] = (value, created_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    # ---------- api ----------
+    def get(self, key, count=True):
+        """Cached value or None. `count=False` leaves hits/misses alone."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._mem.move_to_end(key)
+                    self.hits += count
+                    return entry[0]
+                del self._mem[key]
+                self.evictions += 1
+
+        row = self._conn().execute(
+            "SELECT value, created_at FROM explain_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        with self._lock:
+            if row is None or self._expired(row[1]):
+                self.misses += count
+                return None
+            self._remember(key, row[0], row[1])
+            self.hits += count
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO explain_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, now),
+            )
+
+        with self._lock:
+            self._remember(key, value, now)
+            self._writes += 1
+            purge = self.ttl > 0 and self._writes % PURGE_EVERY == 0
+
+        if purge:
+            with conn:
+                conn.execute(
+                    "DELETE FROM explain_cache WHERE created_at < ?", (now - self.ttl,)
+                )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_items": len(self._mem),
+                "max_items": self.max_items,
+            }
@@ -0,0 +1,127 @@
+"""
+CSS selector extraction for the scraper, on the fastest parser installed:
+selectolax (lexbor, C) > lxml + cssselect > BeautifulSoup.
+Force one with SCRAPER_PARSER=selectolax|lxml|bs4.
+"""
+import os
+
+
+# ---------------- BACKENDS ----------------
+class SelectolaxBackend:
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def compile(self, css):
+        return css  # lexbor caches compiled selectors itself
+
+    def parse(self, html):
+        return self._parser(html)
+
+    def select(self, doc, selector):
+        return doc.css(selector)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def text(self, node):
+        return node.text(strip=True)
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        from lxml.cssselect import CSSSelector
+        self._html = lxml.html
+        self._selector = CSSSelector
+
+    def compile(self, css):
+        return self._selector(css)  # CSS -> XPath once, not per page
+
+    def parse(self, html):
+        return self._html.document_fromstring(html or "<html></html>")
+
+    def select(self, doc, selector):
+        return selector(doc)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def text(self, node):
+        return "".join(s.strip() for s in node.itertext())
+
+
+class Bs4Backend:
+    name = "bs4"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def compile(self, css):
+        return css
+
+    def parse(self, html):
+        return self._soup(html, "html.parser")
+
+    def select(self, doc, selector):
+        return doc.select(selector)
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def text(self, node):
+        return node.get_text(strip=True)
+
+
+BACKENDS = {
+    "selectolax": SelectolaxBackend,
+    "lxml": LxmlBackend,
+    "bs4": Bs4Backend,
+}
+
+
+def load_backend(name=None):
+    """The requested backend, else the first one whose library is installed."""
+    if name and name not in BACKENDS:
+        raise ValueError(f"unknown SCRAPER_PARSER {name!r}, expected one of: {', '.join(BACKENDS)}")
+    names = [name] if name else list(BACKENDS)
+    for n in names:
+        try:
+            return BACKENDS[n]()
+        except ImportError:
+            continue
+    raise ImportError(f"no HTML parser available (tried {', '.join(names)})")
+
+
+parser = load_backend(os.getenv("SCRAPER_PARSER") or None)
+
+
+# ---------------- SITE SELECTORS ----------------
+class SiteSelectors:
+    """A site's `selectors` from sources.json, compiled once."""
+
+    def __init__(self, site, backend=None):
+        self.backend = backend or parser
+        self.links = self.backend.compile(site["selectors"]["links"])
+        self.content = self.backend.compile(site["selectors"]["content"])
+
+    def hrefs(self, doc):
+        return [h for h in (self.backend.attr(n, "href") for n in self.backend.select(doc, self.links)) if h]
+
+    def paragraphs(self, doc):
+        return [self.backend.text(n) for n in self.backend.select(doc, self.content)]
+
+
+_compiled = {}
+
+
+def site_selectors(site) -> SiteSelectors:
+    key = site["name"]
+    if key not in _compiled:
+        _compiled[key] = SiteSelectors(site)
+    return _compiled[key]
@@ -0,0 +1,23 @@
+import re
+import html
+
+# feed summaries (Reddit, most RSS) are HTML; these turn them back into
+# the text a reader actually sees
+_HIDDEN = re.compile(r"<(script|style)\b.*?</\1\s*>", re.S | re.I)
+_TAG = re.compile(r"<[^>]*>")
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.I)
+# Reddit's "submitted by /u/someone [link] [comments]" footer
+_REDDIT_FOOTER = re.compile(r"submitted by\s+/?u/\S+|\[(?:link|comments)\]", re.I)
+_SPACE = re.compile(r"\s+")
+
+
+def visible_text(markup) -> str:
+    """Tags, URLs and feed boilerplate removed, entities decoded."""
+    if not markup:
+        return ""
+    text = _HIDDEN.sub(" ", markup)
+    text = _TAG.sub(" ", text)
+    text = html.unescape(text)
+    text = _URL.sub(" ", text)
+    text = _REDDIT_FOOTER.sub(" ", text)
+    return _SPACE.sub(" ", text).strip()
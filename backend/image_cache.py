@@ -0,0 +1,128 @@
+import os
+import time
+import hashlib
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image as PILImage
+
+from singleflight import SingleFlight
+
+# ---------------- CONFIG ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(BASE_DIR, "image_cache"))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(7 * 86400)))  # seconds
+IMAGE_MISS_TTL = 3600     # remember failed downloads for an hour
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "8"))
+IMAGE_TIMEOUT = 8
+
+# PDF prints images in a 5 x 3 inch box; 150 dpi is plenty for that
+PRINT_BOX = (750, 450)
+
+session = requests.Session()
+session.headers.update({
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "image/*"
+})
+_adapter = HTTPAdapter(pool_connections=IMAGE_WORKERS, pool_maxsize=IMAGE_WORKERS * 2)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+
+_flights = SingleFlight()
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+# ---------------- CACHE ----------------
+def cache_path(url: str) -> str:
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(IMAGE_CACHE_DIR, f"{name}.jpg")
+
+
+def _fresh(path, ttl):
+    try:
+        return time.time() - os.path.getmtime(path) < ttl
+    except OSError:
+        return False
+
+
+def _download(url, path):
+    if _fresh(path, IMAGE_CACHE_TTL):
+        return path
+
+    miss = path + ".miss"
+    try:
+        r = session.get(url, timeout=IMAGE_TIMEOUT)
+        if r.status_code != 200:
+            raise ValueError(f"HTTP {r.status_code}")
+        if not r.headers.get("Content-Type", "").startswith("image/"):
+            raise ValueError("not an image")
+
+        image = PILImage.open(BytesIO(r.content))
+        image.draft("RGB", PRINT_BOX)  # JPEG: decode at reduced size
+        image = image.convert("RGB")
+        image.thumbnail(PRINT_BOX)
+
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp, "JPEG", quality=85, optimize=True)
+        os.replace(tmp, path)
+        return path
+
+    except Exception:
+        # negative entry so repeat papers don't retry dead links
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        open(miss, "w").close()
+        return None
+
+
+def get_image(url):
+    """Local path of a print-sized JPEG for `url`, or None."""
+    if not url:
+        return None
+
+    path = cache_path(url)
+    if _fresh(path, IMAGE_CACHE_TTL):
+        return path
+    if _fresh(path + ".miss", IMAGE_MISS_TTL):
+        return None
+
+    # overlapping papers asking for the same image share one download
+    return _flights.do(path, _download, url, path)
+
+
+def prefetch_images(urls) -> dict:
+    """Download all images concurrently; returns {url: path or None}."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+
+    purge_expired()
+
+    with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+        return dict(zip(urls, pool.map(get_image, urls)))
+
+
+def purge_expired(force=False):
+    """Delete cache entries past their TTL (at most once an hour)."""
+    global _last_purge
+    with _purge_lock:
+        now = time.time()
+        if not force and now - _last_purge < 3600:
+            return
+        _last_purge = now
+
+    if not os.path.isdir(IMAGE_CACHE_DIR):
+        return
+
+    for name in os.listdir(IMAGE_CACHE_DIR):
+        path = os.path.join(IMAGE_CACHE_DIR, name)
+        ttl = IMAGE_MISS_TTL if name.endswith(".miss") else IMAGE_CACHE_TTL
+        if not _fresh(path, ttl):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
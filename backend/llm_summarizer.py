@@ -0,0 +1,195 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from storage import get_connection
+from ai_explainer import summarize_for_newspaper
+
+# ---------------- CONFIG ----------------
+LLM_SUMMARIES = os.getenv("LLM_SUMMARIES", "0") == "1"
+LLM_WORKERS = int(os.getenv("LLM_SUMMARY_WORKERS", "4"))
+LLM_RPM = float(os.getenv("LLM_SUMMARY_RPM", "30"))           # requests per minute
+LLM_BUDGET = int(os.getenv("LLM_SUMMARY_BUDGET", "40"))       # upstream calls per run
+LLM_DEADLINE = float(os.getenv("LLM_SUMMARY_DEADLINE", "120"))  # seconds per run
+LLM_RETRIES = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_summaries (
+    hash       TEXT PRIMARY KEY,
+    summary    TEXT NOT NULL,
+    created_at REAL
+)
+"""
+
+
+# ---------------- RATE LIMIT ----------------
+class RateLimiter:
+    """Spaces calls evenly so all workers together stay under `rpm`."""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, until) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            if slot > until:
+                return False
+            self._next = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+        return True
+
+
+# one limiter for the whole process: summarize runs call in batches, and
+# the RPM limit must hold across them
+limiter = RateLimiter(LLM_RPM)
+
+
+class CallBudget:
+    """Upstream calls left for one summarize_articles() call; retries count."""
+
+    def __init__(self, limit):
+        self.left = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            self.used += 1
+            return True
+
+
+# ---------------- CACHE ----------------
+def summary_hash(article: dict) -> str:
+    raw = "\n".join([
+        article.get("title") or "",
+        article.get("content") or "",
+        article.get("source") or "",
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_conn():
+    conn = get_connection()
+    conn.execute(SCHEMA)
+    return conn
+
+
+def load_cached(hashes):
+    conn = _cache_conn()
+    found = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT hash, summary FROM llm_summaries WHERE hash IN ({marks})", chunk
+        )
+        found.update(rows)
+    return found
+
+
+def store_cached(results: dict):
+    if not results:
+        return
+    conn = _cache_conn()
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO llm_summaries (hash, summary, created_at) VALUES (?, ?, ?)",
+            [(h, s, now) for h, s in results.items()],
+        )
+
+
+# ---------------- WORKER ----------------
+def _summarize_one(article, limiter, budget, until, llm):
+    for attempt in range(LLM_RETRIES):
+        if not limiter.acquire(until) or not budget.take():
+            return None
+        try:
+            text = summarize_for_newspaper(
+                article.get("title") or "",
+                article.get("content") or "",
+                article.get("source") or "",
+                llm=llm,
+            )
+            return text or None
+        except Exception as e:
+            print("❌ Gemini summary error:", e)
+            backoff = (2 ** attempt) + random.random()
+            if time.monotonic() + backoff > until:
+                return None
+            time.sleep(backoff)
+    return None
+
+
+def summarize_articles(
+    articles,
+    fallback,
+    llm=None,
+    budget=LLM_BUDGET,
+    deadline=LLM_DEADLINE,
+    workers=LLM_WORKERS,
+    rate_limiter=None,
+    usage=None,
+):
+    """
+    Newspaper summaries for `articles`, in the same order, plus a flag per
+    article telling whether its summary came from the LLM (else fallback).
+    - cached by content hash, so each article hits the LLM at most once
+    - at most `budget` upstream calls (retries included), spread over
+      `workers` threads and paced by the shared RPM `limiter`
+    - anything not done by `deadline` seconds uses `fallback(article)`
+    `llm` is a genai-style client; None means the shared Gemini client.
+    `usage["calls"]` is increased by the number of upstream calls made.
+    """
+    articles = list(articles)
+    hashes = [summary_hash(a) for a in articles]
+    cached = load_cached(set(hashes))
+
+    todo = {}
+    for h, a in zip(hashes, articles):
+        if h not in cached and h not in todo and len(todo) < budget:
+            todo[h] = a
+
+    if deadline <= 0:
+        todo = {}
+
+    fresh = {}
+    calls = CallBudget(budget)
+    if todo:
+        until = time.monotonic() + deadline
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            pool.submit(_summarize_one, a, rate_limiter or limiter, calls, until, llm): h
+            for h, a in todo.items()
+        }
+        done, _ = wait(futures, timeout=deadline)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        for fut in done:
+            text = fut.result()
+            if text:
+                fresh[futures[fut]] = text
+        store_cached(fresh)
+
+    if usage is not None:
+        usage["calls"] = usage.get("calls", 0) + calls.used
+
+    out = []
+    from_llm = []
+    for h, a in zip(hashes, articles):
+        text = cached.get(h) or fresh.get(h)
+        from_llm.append(bool(text))
+        out.append(text or fallback(a))
+
+    print(f"🧠 LLM summaries: {len(cached)} cached, {len(fresh)} new, {from_llm.count(False)} fallback")
+    return out, from_llm
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from datetime import datetime
 
 class User(Base):
@@ -23,6 +23,12 @@ class Article(Base):
     source = Column(String, default="blogger")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_articles_created_id", "created_at", "id"),
+        Index("ix_articles_category_created", "category", "created_at", "id"),
+        Index("ix_articles_author_created", "author_email", "created_at", "id"),
+    )
+
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
@@ -32,6 +38,11 @@ class UserPreference(Base):
     category = Column(String)  # india | tech | sports | world
     score = Column(Integer, default=0)
 
+    # one row per (user, category) so /track can upsert
+    __table_args__ = (
+        Index("uq_user_preferences_email_category", "user_email", "category", unique=True),
+    )
+
 
 class UserNewspaper(Base):
     __tablename__ = "user_newspapers"
@@ -40,4 +51,11 @@ class UserNewspaper(Base):
     user_email = Column(String, index=True)
     date = Column(String)  # YYYY-MM-DD
     articles_json = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # one paper per user per day (also the today's-paper lookup),
+    # and "latest paper" lookup
+    __table_args__ = (
+        Index("uq_user_newspapers_email_date", "user_email", "date", unique=True),
+        Index("ix_user_newspapers_email_created", "user_email", "created_at"),
+    )
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+from storage import load_articles, count_articles, get_version, SUMMARIZED
+
+# how many of the newest summarized articles are kept parsed in memory
+NEWS_CACHE_SIZE = int(os.getenv("NEWS_CACHE_SIZE", "10000"))
+
+# other workers write through the same news.db; poll its version at most
+# this often (seconds) so every request stays a dict lookup
+NEWS_CACHE_CHECK_INTERVAL = float(os.getenv("NEWS_CACHE_CHECK_INTERVAL", "2"))
+
+
+class NewsSnapshot:
+    """Immutable view of the summarized corpus. Swapped as a whole, never
+    mutated in place, so readers need no lock."""
+
+    def __init__(self, version, articles, size):
+        self.version = version
+        self.articles = tuple(articles)
+        # the store holds more than we cached
+        self.truncated = len(self.articles) >= size
+
+        by_category = {}
+        for a in self.articles:
+            by_category.setdefault(a.get("category"), []).append(a)
+        self.by_category = {k: tuple(v) for k, v in by_category.items()}
+
+        self._heads = {}
+        self._totals = {}
+
+    def head(self, limit):
+        """First `limit` articles. Slices are built once per limit and
+        reused, so repeat polls return the same object."""
+        if limit >= len(self.articles):
+            return self.articles
+        head = self._heads.get(limit)
+        if head is None:
+            head = self._heads[limit] = self.articles[:limit]
+        return head
+
+    def category(self, name):
+        return self.by_category.get(name, ())
+
+    def total(self, category=None):
+        """Size of the feed (or one category). Past the cached window it
+        comes from the store, counted once per snapshot."""
+        if not self.truncated:
+            return len(self.articles if category is None else self.category(category))
+        total = self._totals.get(category)
+        if total is None:
+            total = self._totals[category] = count_articles(SUMMARIZED, category)
+        return total
+
+    def page(self, offset, limit, category=None):
+        """Slice of the feed, or None if it reaches past what is cached.
+        The cached window is the newest prefix of the feed, so any page
+        that fits inside it is exact."""
+        items = self.articles if category is None else self.category(category)
+        end = offset + limit
+        if self.truncated and end > len(items):
+            return None
+        if offset == 0 and category is None:
+            return self.head(limit)
+        return items[offset:end]
+
+
+class NewsCache:
+    def __init__(self, size=NEWS_CACHE_SIZE, check_interval=NEWS_CACHE_CHECK_INTERVAL):
+        self.size = size
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        version = get_version(SUMMARIZED)
+        articles = load_articles(SUMMARIZED, limit=self.size)
+        self._snapshot = NewsSnapshot(version, articles, self.size)
+        self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def get(self) -> NewsSnapshot:
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snap
+
+            # cheap version check; reload only if another writer changed it
+            if snap is not None and snap.version == get_version(SUMMARIZED):
+                self._checked_at = time.monotonic()
+                return snap
+            return self._load()
+
+    def refresh(self) -> NewsSnapshot:
+        """Rebuild and swap in one step (called after summarization)."""
+        with self._lock:
+            return self._load()
+
+
+news_cache = NewsCache()
@@ -2,6 +2,10 @@ import json
 import requests
 import feedparser
 from typing import List
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from storage import load_feed_state
+from dedupe import collapse_duplicates
 
 import os
 from dotenv import load_dotenv
@@ -106,14 +110,69 @@ def fetch_newsdata() -> List[dict]:
 
 
 
+# -----------------------------
+# FEED helper
+# -----------------------------
+FEED_TIMEOUT = 10
+
+
+def parse_feed(url, state=None):
+    """
+    Download with a timeout (feedparser has none), then parse.
+    With a `state` dict the request is conditional (ETag /
+    Last-Modified); returns None on 304 Not Modified and stores the new
+    validators back into `state`.
+    Raises on network errors and other statuses, so the caller keeps the
+    previous state instead of saving an empty "seen" list.
+    """
+    headers = {"User-Agent": "NewsFrog/1.0"}
+    if state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+
+    r = requests.get(url, timeout=FEED_TIMEOUT, headers=headers)
+
+    if r.status_code == 304:
+        return None
+    if r.status_code != 200:
+        raise RuntimeError(f"HTTP {r.status_code} from {url}")
+
+    if state is not None:
+        state["etag"] = r.headers.get("ETag")
+        state["modified"] = r.headers.get("Last-Modified")
+
+    return feedparser.parse(r.content)
+
+
+def _entry_id(e):
+    return e.get("id") or e.get("link") or e.get("title")
+
+
+def feed_entries(url, limit, state=None):
+    """Entries not seen on the previous poll of this feed."""
+    feed = parse_feed(url, state)
+    if feed is None:
+        return []
+
+    entries = feed.entries[:limit]
+    if state is None:
+        return entries
+
+    seen = set(state.get("seen") or [])
+    state["seen"] = [_entry_id(e) for e in entries]
+    return [e for e in entries if _entry_id(e) not in seen]
+
+
 # -----------------------------
 # REDDIT helper
 # -----------------------------
-def fetch_reddit(subreddit) -> List[dict]:
-    feed = feedparser.parse(f"https://www.reddit.com/r/{subreddit}/.rss")
+def fetch_reddit(subreddit, state=None) -> List[dict]:
+    entries = feed_entries(f"https://www.reddit.com/r/{subreddit}/.rss", 25, state)
 
     out = []
-    for e in feed.entries[:25]:
+    for e in entries:
         out.append({
             "source": f"Reddit-{subreddit}",
             "title": e.get("title"),
@@ -129,11 +188,11 @@ def fetch_reddit(subreddit) -> List[dict]:
 # -----------------------------
 # RSS helper
 # -----------------------------
-def fetch_rss(url, category="general") -> List[dict]:
-    feed = feedparser.parse(url)
+def fetch_rss(url, category="general", state=None) -> List[dict]:
+    entries = feed_entries(url, 30, state)
 
     out = []
-    for e in feed.entries[:30]:
+    for e in entries:
         out.append({
             "source": "RSS",
             "title": e.get("title"),
@@ -149,13 +208,54 @@ def fetch_rss(url, category="general") -> List[dict]:
 # -----------------------------
 # main collector
 # -----------------------------
-def fetch_all_sources() -> List[dict]:
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "25"))
+
+REDDIT_SUBS = ["india", "worldnews", "technology", "sports"]
+
+RSS_FEEDS = [
+    ("https://timesofindia.indiatimes.com/rssfeeds/-2128936835.cms", "india"),
+    ("https://www.hindustantimes.com/rss/topnews/rssfeed.xml", "india"),
+    ("http://feeds.reuters.com/reuters/worldnews", "world"),
+    ("http://feeds.bbci.co.uk/news/world/rss.xml", "world"),
+]
+
+# counts from the most recent fetch_all_sources() run, by source name
+last_source_counts = {}
+
+
+def _source_jobs(feed_state):
+    """(name, fetcher, args, feed_url) in the order results are merged +
+    deduped. Feeds get their own entry of `feed_state` to read and update."""
+    jobs = [
+        ("NewsAPI", fetch_newsapi, (), None),
+        ("GNews", fetch_gnews, (), None),
+        ("NewsData", fetch_newsdata, (), None),
+    ]
+    for sub in REDDIT_SUBS:
+        url = f"https://www.reddit.com/r/{sub}/.rss"
+        jobs.append((f"Reddit-{sub}", fetch_reddit, (sub, feed_state.setdefault(url, {})), url))
+    for url, cat in RSS_FEEDS:
+        jobs.append((f"RSS {url}", fetch_rss, (url, cat, feed_state.setdefault(url, {})), url))
+    return jobs
+
+
+def fetch_all_sources(deadline: float = FETCH_DEADLINE):
+    """
+    Fetch every source concurrently. Returns (articles, feed_state):
+    the new ETag / seen ids of feeds that finished, to be saved by the
+    caller together with the articles (storage.upsert_articles).
+    Each source has its own request timeout; anything still running when
+    the global deadline hits is dropped. Results are merged in the fixed
+    source order above, so dedupe stays deterministic.
+    """
 
     articles = []
     seen = set()
 
     # --- helper to add + dedupe ---
     def add(items):
+        added = 0
         for a in items:
             url = a.get("url") or a.get("title")
             if not url:
@@ -165,37 +265,52 @@ def fetch_all_sources() -> List[dict]:
                 continue
             seen.add(key)
             articles.append(a)
+            added += 1
+        return added
+
+    # ETag / Last-Modified / seen entry ids from the previous run
+    feed_state = load_feed_state()
+    jobs = _source_jobs(feed_state)
+    pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    futures = [pool.submit(fn, *args) for _, fn, args, _ in jobs]
+
+    done, _ = wait(futures, timeout=deadline)
+    # don't let a hung source hold up the response
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    counts = {}
+    finished_feeds = {}
+    for (name, _, _, feed_url), fut in zip(jobs, futures):
+        if fut not in done:
+            print("⏱️ Timed out:", name)
+            counts[name] = None
+            continue
+        try:
+            items = fut.result()
+            if feed_url:
+                finished_feeds[feed_url] = feed_state[feed_url]
+        except Exception as e:
+            print("❌ Source failed:", name, e)
+            items = []
+        counts[name] = {"fetched": len(items), "added": add(items)}
+
+    # same story from several sources -> one canonical article
+    before = len(articles)
+    articles = collapse_duplicates(articles)
+    if before != len(articles):
+        print("🧩 Collapsed", before - len(articles), "near-duplicate stories")
+
+    last_source_counts.clear()
+    last_source_counts.update(counts)
 
-    # --- API sources (dedupe) ---
-    add(fetch_newsapi())
-    add(fetch_gnews())
-    add(fetch_newsdata())
-
-    # --- Reddit (unique URLs anyway, still deduped) ---
-    REDDIT_SUBS = ["india", "worldnews", "technology", "sports"]
-    for sub in REDDIT_SUBS:
-        add(fetch_reddit(sub))
-
-    # --- RSS feeds ---
-    RSS_FEEDS = [
-        ("https://timesofindia.indiatimes.com/rssfeeds/-2128936835.cms", "india"),
-        ("https://www.hindustantimes.com/rss/topnews/rssfeed.xml", "india"),
-        ("http://feeds.reuters.com/reuters/worldnews", "world"),
-        ("http://feeds.bbci.co.uk/news/world/rss.xml", "world"),
-    ]
-
-    for url, cat in RSS_FEEDS:
-        add(fetch_rss(url, cat))
     print("TOTAL RETURNING:", len(articles))
-    print("Added", len(fetch_newsapi()), "from NewsAPI")
-    print("Added", len(fetch_gnews()), "from GNews")
-    print("Added", len(fetch_newsdata()), "from NewsData")
-    print("Added", len(fetch_reddit('india')), "from Reddit India")
-    print("Added", len(fetch_reddit('worldnews')), "from Reddit World")
-    print("Added", len(fetch_reddit('technology')), "from Reddit Tech")
-    print("Added", len(fetch_reddit('sports')), "from Reddit Sports")
-
-    return articles
+    for name, c in counts.items():
+        if c is None:
+            print("Added 0 from", name, "(timed out)")
+        else:
+            print("Added", c["added"], "of", c["fetched"], "from", name)
+
+    return articles, finished_feeds
 
 if __name__ == "__main__":
     print("newsapi:", len(fetch_newsapi()))
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+
+from image_cache import prefetch_images
+
+# ---------------- CONFIG ----------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_DIR = os.path.join(BASE_DIR, "generated_pdfs")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_MAX_AGE = float(os.getenv("PDF_MAX_AGE", str(2 * 86400)))                # seconds
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(500 * 1024 * 1024)))      # whole folder
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    # the pool starts lazily, when the server already runs threads holding
+    # locks and SQLite handles; fork would copy those into the workers
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Rendering is CPU + blocking I/O; keep it off the event loop and
+    out of the API process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=_mp_context())
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ---------------- CACHE ----------------
+def newspaper_key(articles, date) -> str:
+    raw = json.dumps({"articles": articles, "date": date}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def newspaper_path(articles, date) -> str:
+    return os.path.join(PDF_DIR, f"newspaper_{newspaper_key(articles, date)}.pdf")
+
+
+def cleanup_pdfs(max_age=PDF_MAX_AGE, max_bytes=PDF_MAX_BYTES):
+    """Janitor: drop PDFs older than max_age, then the least recently
+    served ones until the folder fits in max_bytes."""
+    if not os.path.isdir(PDF_DIR):
+        return
+
+    now = time.time()
+    files = []
+    for name in os.listdir(PDF_DIR):
+        path = os.path.join(PDF_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if now - st.st_mtime > max_age:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# ---------------- RENDER ----------------
+def render_newspaper(articles, date, path):
+    """Build the PDF at `path` (runs inside a pool process)."""
+    os.makedirs(PDF_DIR, exist_ok=True)
+    final_path = path
+    path = f"{final_path}.{os.getpid()}.tmp"
+
+    doc = SimpleDocTemplate(
+        path,
+        pagesize=A4,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40
+    )
+
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph("<b>AI Daily Newspaper</b>", styles["Title"]))
+    story.append(Spacer(1, 0.2 * inch))
+    story.append(Paragraph(f"<i>{date}</i>", styles["Normal"]))
+    story.append(Spacer(1, 0.4 * inch))
+
+    # all images at once, from the on-disk cache where possible
+    images = prefetch_images(a.get("image") for a in articles)
+
+    for idx, article in enumerate(articles, start=1):
+        title_text = article.get("title", "No title")
+
+        summary_text = (
+                article.get("newspaper_summary")
+                or article.get("summary")
+                or ""
+        )
+
+        # 🔒 FINAL GUARANTEE: NEVER EMPTY IN PDF
+        if not summary_text or len(summary_text.strip()) < 60:
+            headline_core = title_text.split(":")[0]
+            summary_text = (
+                f"{headline_core}. "
+                f"The report outlines recent developments and key facts "
+                f"as reported by {article.get('source') or 'the news outlet'}."
+            )
+
+        story.append(
+            Paragraph(f"<b>{idx}. {escape(title_text)}</b>", styles["Heading2"])
+        )
+        story.append(Spacer(1, 10))
+
+        img_path = images.get(article.get("image"))
+        if img_path and os.path.exists(img_path):
+            try:
+                story.append(Image(img_path, width=5 * inch, height=3 * inch))
+                story.append(Spacer(1, 12))
+            except:
+                pass
+
+        story.append(
+            Paragraph(escape(summary_text), styles["BodyText"])
+        )
+        story.append(Spacer(1, 25))
+
+    doc.build(story)
+
+    # readers never see a half-written file
+    os.replace(path, final_path)
+    return final_path
@@ -0,0 +1,118 @@
+import json
+from datetime import date, datetime
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy.dialects import sqlite, postgresql
+
+from database import SessionLocal, engine
+from models import UserPreference, UserNewspaper
+from news_cache import news_cache
+from preference_buffer import preference_buffer
+
+PAPER_SIZE = 12
+
+
+def _insert_papers():
+    """INSERT that skips users who already have a paper for that day
+    (unique user_email + date), so the batch job and /newspaper/build
+    can't both write one."""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(UserNewspaper).on_conflict_do_nothing(
+        index_elements=["user_email", "date"]
+    )
+
+
+def pick_articles(categories, by_category, size=PAPER_SIZE):
+    """Walk the user's categories best-first and stop as soon as the
+    paper is full. `by_category` is the news cache's category index."""
+    picked = []
+    seen = set()
+
+    for category in categories:
+        for n in by_category.get(category, ()):
+            if n["title"] in seen:
+                continue
+            picked.append(n)
+            seen.add(n["title"])
+            if len(picked) >= size:
+                return picked
+
+    return picked
+
+
+def build_user_newspaper(db, email, today=None):
+    """On-demand build for one user (used when the batch hasn't run)."""
+    today = today or date.today().isoformat()
+    preference_buffer.flush()
+
+    prefs = (
+        db.query(UserPreference.category)
+        .filter_by(user_email=email)
+        .order_by(UserPreference.score.desc())
+        .all()
+    )
+    if not prefs:
+        return None
+
+    picked = pick_articles([c for (c,) in prefs], news_cache.get().by_category)
+
+    db.execute(_insert_papers(), [{
+        "user_email": email,
+        "date": today,
+        "articles_json": json.dumps(picked),
+        "created_at": datetime.utcnow(),
+    }])
+    db.commit()
+    # ours, or the one the batch job wrote first
+    return db.query(UserNewspaper).filter_by(user_email=email, date=today).first()
+
+
+def build_daily_newspapers(today=None) -> int:
+    """
+    Batch job, run after summarization: today's paper for every user
+    with preferences who doesn't have one yet.
+    One preferences query, one pass, one bulk insert.
+    """
+    today = today or date.today().isoformat()
+    by_category = news_cache.get().by_category
+    preference_buffer.flush()
+    if not by_category:
+        return 0
+
+    db = SessionLocal()
+    try:
+        done = {
+            email for (email,) in
+            db.query(UserNewspaper.user_email).filter_by(date=today)
+        }
+
+        prefs = (
+            db.query(UserPreference.user_email, UserPreference.category)
+            .order_by(UserPreference.user_email, UserPreference.score.desc())
+            .all()
+        )
+
+        now = datetime.utcnow()
+        rows = []
+        for email, group in groupby(prefs, key=itemgetter(0)):
+            if email in done:
+                continue
+            picked = pick_articles([c for _, c in group], by_category)
+            if not picked:
+                continue
+            rows.append({
+                "user_email": email,
+                "date": today,
+                "articles_json": json.dumps(picked),
+                "created_at": now,
+            })
+
+        if rows:
+            db.execute(_insert_papers(), rows)
+            db.commit()
+
+        print("🗞 Prebuilt newspapers:", len(rows))
+        return len(rows)
+    finally:
+        db.close()
@@ -0,0 +1,91 @@
+import os
+import threading
+
+from sqlalchemy.dialects import sqlite, postgresql
+
+from database import SessionLocal, engine
+from models import UserPreference
+
+PREF_FLUSH_INTERVAL = float(os.getenv("PREF_FLUSH_INTERVAL", "5"))  # seconds
+
+
+def _insert():
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(UserPreference)
+
+
+class PreferenceBuffer:
+    """
+    /track clicks add to an in-memory (user_email, category) -> delta map.
+    A background thread flushes it every few seconds as one upsert
+    transaction, instead of a SELECT + commit per click.
+    """
+
+    def __init__(self, interval=PREF_FLUSH_INTERVAL):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, user_email, category, weight=1):
+        key = (user_email, category)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + weight
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            rows = [
+                {"user_email": email, "category": category, "score": delta}
+                for (email, category), delta in pending.items()
+            ]
+
+            stmt = _insert()
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_email", "category"],
+                set_={"score": UserPreference.score + stmt.excluded.score},
+            )
+
+            db = SessionLocal()
+            try:
+                db.execute(stmt, rows)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print("❌ Preference flush failed:", e)
+                # put the deltas back so the next flush retries them
+                with self._lock:
+                    for key, delta in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + delta
+                return 0
+            finally:
+                db.close()
+
+            return len(rows)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Shutdown hook: stop the thread and write what's left."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.flush()
+
+
+preference_buffer = PreferenceBuffer()
@@ -0,0 +1,164 @@
+import os
+import time
+import random
+import socket
+import threading
+
+from storage import acquire_lease, release_lease
+
+PIPELINE_INTERVAL = float(os.getenv("PIPELINE_INTERVAL", "1800"))   # seconds, 0 = off
+PIPELINE_JITTER = float(os.getenv("PIPELINE_JITTER", "60"))         # +/- seconds
+PIPELINE_INITIAL_DELAY = float(os.getenv("PIPELINE_INITIAL_DELAY", "10"))
+PIPELINE_LEASE_TTL = float(os.getenv("PIPELINE_LEASE_TTL", "3600"))  # crashed holder frees it after
+PIPELINE_RETRY = 5  # seconds between tries while another worker holds the lease
+
+
+class PipelineScheduler:
+    """
+    Runs named steps (fetch -> summarize) on an interval, and on demand.
+    One run at a time, scheduled or manual: a thread lock inside this
+    process plus a lease row in news.db across uvicorn workers, so two
+    pipelines never write the article store at the same time.
+    """
+
+    def __init__(self, steps, interval=PIPELINE_INTERVAL, jitter=PIPELINE_JITTER,
+                 initial_delay=PIPELINE_INITIAL_DELAY, lease="pipeline"):
+        self.steps = dict(steps)        # name -> callable, in run order
+        self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.lease = lease
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+
+        self._state = threading.Lock()  # guards _running / _pending
+        self._running = False
+        self._pending = []              # steps asked for while busy
+        self._stop = threading.Event()
+        self._thread = None
+        self._waiter = None
+
+        self._status = {
+            "state": "idle",            # idle | running
+            "current_step": None,
+            "trigger": None,            # schedule | manual | queued
+            "runs": 0,
+            "pending": [],
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_error": None,
+            "durations": {},            # step -> seconds, last run
+            "next_run_at": None,
+        }
+
+    @property
+    def busy(self):
+        return self._running
+
+    def status(self):
+        return dict(self._status, pending=list(self._pending),
+                    durations=dict(self._status["durations"]))
+
+    def _ordered(self, names):
+        names = set(names)
+        return [n for n in self.steps if n in names]
+
+    def run(self, steps=None, trigger="manual", queue=False):
+        """
+        Run the given steps (default: all) if no run is active here or in
+        another worker. With `queue`, a busy pipeline keeps them and runs
+        them as soon as it is free. Returns (ran, {step: result}).
+        """
+        steps = list(self.steps) if steps is None else list(steps)
+        with self._state:
+            if self._running or not acquire_lease(self.lease, self._owner, PIPELINE_LEASE_TTL):
+                if queue:
+                    self._queue(steps)
+                return False, {}
+            self._running = True
+            steps, self._pending = self._ordered(steps + self._pending), []
+
+        results = {}
+        try:
+            while True:
+                results.update(self._run_steps(steps, trigger))
+                with self._state:
+                    if not self._pending:
+                        self._running = False
+                        release_lease(self.lease, self._owner)
+                        return True, results
+                    steps, self._pending = self._ordered(self._pending), []
+                trigger = "queued"
+        except BaseException:
+            with self._state:
+                self._running = False
+                release_lease(self.lease, self._owner)
+            raise
+
+    def _run_steps(self, steps, trigger):
+        results = {}
+        st = self._status
+        try:
+            st.update(state="running", trigger=trigger, last_started_at=time.time(),
+                      last_error=None)
+            for name in steps:
+                acquire_lease(self.lease, self._owner, PIPELINE_LEASE_TTL)  # renew
+                st["current_step"] = name
+                t0 = time.monotonic()
+                results[name] = self.steps[name]()
+                st["durations"][name] = round(time.monotonic() - t0, 3)
+            st["runs"] += 1
+
+        except Exception as e:
+            st["last_error"] = f"{st['current_step']}: {e}"
+            print("❌ Pipeline failed:", st["last_error"])
+
+        finally:
+            st.update(state="idle", current_step=None, last_finished_at=time.time())
+        return results
+
+    # ---------- queued runs ----------
+    def _queue(self, steps):
+        """Called with _state held."""
+        self._pending = self._ordered(self._pending + steps)
+        # a local run picks these up when it finishes; if the lease is held
+        # by another worker, poll until it is released
+        if not self._running and (self._waiter is None or not self._waiter.is_alive()):
+            self._waiter = threading.Thread(target=self._wait_for_lease, daemon=True)
+            self._waiter.start()
+
+    def _wait_for_lease(self):
+        while not self._stop.wait(PIPELINE_RETRY):
+            with self._state:
+                if self._running or not self._pending:
+                    return
+                pending = list(self._pending)
+            ran, _ = self.run(pending, trigger="queued")
+            if ran:
+                return
+
+    # ---------- background loop ----------
+    def _delay(self, base):
+        return max(1.0, base + random.uniform(-self.jitter, self.jitter))
+
+    def _loop(self):
+        delay = self._delay(self.initial_delay)
+        while True:
+            self._status["next_run_at"] = time.time() + delay
+            if self._stop.wait(delay):
+                return
+            ran, _ = self.run(trigger="schedule")
+            if not ran:
+                print("⏳ Scheduled run skipped, pipeline busy")
+            delay = self._delay(self.interval)
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+        self._status["next_run_at"] = None
@@ -1,38 +1,61 @@
+import os
 import json
+from urllib.parse import urlparse
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from browser_pool import browser_pool
+from html_parser import parser, site_selectors
+from storage import frontier_due, mark_crawled
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "16"))   # global cap
+PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST", "2"))    # polite per-site cap
+MAX_ARTICLES_PER_SITE = 10
+SCRAPER_REVISIT = float(os.getenv("SCRAPER_REVISIT", str(7 * 86400)))  # refetch seen pages after
+SCRAPER_DEBUG = os.getenv("SCRAPER_DEBUG", "0") == "1"      # dump listing HTML
+
+# -----------------------------
+# HTTP SESSION (shared, pooled, retrying)
+# -----------------------------
+session = requests.Session()
+session.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9"
+})
+_retry = Retry(
+    total=3,
+    backoff_factor=0.5,                      # 0.5s, 1s, 2s
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+)
+_adapter = HTTPAdapter(max_retries=_retry, pool_connections=32, pool_maxsize=SCRAPER_WORKERS)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
 
 # -----------------------------
 # FETCH FUNCTIONS
 # -----------------------------
 
 def fetch_static(url):
-    r = requests.get(url, timeout=10, headers={
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9"
-    })
-    return BeautifulSoup(r.text, "html.parser")
+    r = session.get(url, timeout=10)
+    return r.text
 
 
 
 def fetch_dynamic(url):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)  # run visible to avoid bot block
-        context = browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        ))
+    # rendered by a shared, already running headless browser (browser_pool.py)
+    return browser_pool.fetch(url)
 
-        page = context.new_page()
-
-        page.goto(url, timeout=60000, wait_until="networkidle")  # wait for JS to finish
-        page.wait_for_selector("body")
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")  # load lazy content
-
-        html = page.content()
-        browser.close()
-        return BeautifulSoup(html, "html.parser")
 
+def fetch_html(url, site):
+    return fetch_dynamic(url) if site["dynamic"] else fetch_static(url)
 
 
 # -----------------------------
@@ -40,19 +63,16 @@ def fetch_dynamic(url):
 # -----------------------------
 
 def extract_links(site):
-    parser = fetch_dynamic(site["list_url"]) if site["dynamic"] else fetch_static(site["list_url"])
+    html = fetch_html(site["list_url"], site)
 
-    print("\n===== DEBUG HTML START =====")
-    print(parser.prettify()[:800])
-    print("===== DEBUG HTML END =====\n")
+    if SCRAPER_DEBUG:
+        print("\n===== DEBUG HTML START =====")
+        print(html[:800])
+        print("===== DEBUG HTML END =====\n")
 
     links = []
 
-    for tag in parser.select(site["selectors"]["links"]):
-        href = tag.get("href")
-        if not href:
-            continue
-
+    for href in site_selectors(site).hrefs(parser.parse(html)):
         # Convert relative URLs to absolute
         if href.startswith("/"):
             href = site["base_url"] + href
@@ -60,7 +80,7 @@ def extract_links(site):
         if href.startswith("http"):
             links.append(href)
 
-    return list(set(links))[:10]  # limit to latest 10 articles
+    return list(dict.fromkeys(links))  # deduped, listing order (newest first)
 
 
 # -----------------------------
@@ -69,9 +89,8 @@ def extract_links(site):
 
 def extract_article(url, site):
     """Extract full text from one article"""
-    parser = fetch_dynamic(url) if site["dynamic"] else fetch_static(url)
-    paragraphs = parser.select(site["selectors"]["content"])
-    text = " ".join(p.get_text(strip=True) for p in paragraphs)
+    doc = parser.parse(fetch_html(url, site))
+    text = " ".join(site_selectors(site).paragraphs(doc))
 
     return {
         "source": site["name"],
@@ -84,25 +103,90 @@ def extract_article(url, site):
 # MAIN SCRAPER
 # -----------------------------
 
-def run_scraper():
-    with open("sources.json", "r") as f:
+def run_scraper(output_path="scraped_output.jsonl", sources_path="sources.json"):
+    """
+    Crawl every site concurrently: listing pages and article pages all go
+    through one pool (SCRAPER_WORKERS) with at most PER_HOST_LIMIT requests
+    per host at a time. Articles are appended to `output_path` (JSONL) as
+    they finish, so the file builds up across runs; this run's articles
+    are also returned.
+
+    The crawl frontier (news.db) remembers what was fetched: each run only
+    visits links that are new or older than SCRAPER_REVISIT, newest first,
+    and only emits articles whose text is new or changed.
+    """
+    with open(sources_path, "r") as f:
         sources = json.load(f)
 
+    # results are collected on this thread only, so a plain file is enough.
+    # Appended, not truncated: repeat runs only emit new or changed pages.
+    out = open(output_path, "a", encoding="utf-8") if output_path else None
     scraped_data = []
 
+    pool = ThreadPoolExecutor(max_workers=SCRAPER_WORKERS)
+    pending = {}                    # future -> (kind, site, url, host)
+    waiting = defaultdict(deque)    # host -> jobs not yet handed to the pool
+    in_flight = Counter()           # host -> jobs in the pool
+
+    # per-host limits are enforced here, not inside workers, so a busy
+    # site never parks pool threads that other sites could use
+    def dispatch(host):
+        while waiting[host] and in_flight[host] < PER_HOST_LIMIT:
+            kind, site, url = waiting[host].popleft()
+            if kind == "links":
+                fut = pool.submit(extract_links, site)
+            else:
+                fut = pool.submit(extract_article, url, site)
+            pending[fut] = (kind, site, url, host)
+            in_flight[host] += 1
+
+    def enqueue(kind, site, url):
+        host = urlparse(url).netloc
+        waiting[host].append((kind, site, url))
+        dispatch(host)
+
     for site in sources:
         print(f"\n🔍 Scraping {site['name']}...")
-
-        links = extract_links(site)
-        print(f"Found {len(links)} links")
-
-        for link in links:
-            try:
-                article = extract_article(link, site)
+        enqueue("links", site, site["list_url"])
+
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, site, url, host = pending.pop(fut)
+                in_flight[host] -= 1
+                dispatch(host)
+
+                if kind == "links":
+                    try:
+                        links = fut.result()
+                    except Exception as e:
+                        print(f"❌ Error listing {site['name']}: {e}")
+                        continue
+                    due = frontier_due(links, SCRAPER_REVISIT)[:MAX_ARTICLES_PER_SITE]
+                    print(f"Found {len(links)} links on {site['name']}, {len(due)} to fetch")
+                    for link in due:
+                        enqueue("article", site, link)
+                    continue
+
+                link = url
+                try:
+                    article = fut.result()
+                except Exception as e:
+                    print(f"❌ Error scraping {link}: {e}")
+                    continue
+                if not mark_crawled(link, site["name"], article["text"]):
+                    print(f"➖ Unchanged: {link}")
+                    continue
                 scraped_data.append(article)
+                if out:
+                    out.write(json.dumps(article, ensure_ascii=False) + "\n")
+                    out.flush()
                 print(f"✔️ Scraped: {link}")
-            except Exception as e:
-                print(f"❌ Error scraping {link}: {e}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        if out:
+            out.close()
 
     return scraped_data
 
@@ -112,10 +196,6 @@ def run_scraper():
 # -----------------------------
 
 if __name__ == "__main__":
-    data = run_scraper()
-
-    # Save to file
-    with open("scraped_output.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    data = run_scraper("scraped_output.jsonl")
 
-    print("\n✅ Scraping Completed! Data saved to scraped_output.json")
+    print(f"\n✅ Scraping Completed! {len(data)} new articles appended to scraped_output.jsonl")
@@ -1,18 +1,485 @@
 import json
+import os
+import re
+import html
+import sqlite3
+import hashlib
+import threading
+import time
 from pathlib import Path
 
+from html_text import visible_text
+
 DATA_DIR = Path.cwd()
+BASE_DIR = Path(__file__).resolve().parent
 
+# article store lives next to users.db
+NEWS_DB_PATH = Path(os.getenv("NEWS_DB_PATH", BASE_DIR / "news.db"))
 
-def save_json(filename: str, data):
-    path = DATA_DIR / filename
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+# collections
+RAW = "raw"
+SUMMARIZED = "summarized"
+
+# old whole-file JSON stores, imported once on first start
+LEGACY_FILES = {
+    RAW: "news_output.json",
+    SUMMARIZED: "summarized_news.json",
+}
 
 
+# ---------------- JSON FILES ----------------
 def load_json(filename: str):
     path = DATA_DIR / filename
     if not path.exists():
         return []
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+
+# ---------------- ARTICLE STORE ----------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    collection   TEXT    NOT NULL,
+    key          TEXT    NOT NULL,
+    batch        INTEGER NOT NULL,
+    pos          INTEGER NOT NULL,
+    category     TEXT,
+    content_hash TEXT,
+    source_hash  TEXT,
+    data         TEXT    NOT NULL,
+    updated_at   REAL,
+    PRIMARY KEY (collection, key)
+);
+CREATE INDEX IF NOT EXISTS ix_articles_feed
+    ON articles (collection, batch DESC, pos);
+CREATE INDEX IF NOT EXISTS ix_articles_category
+    ON articles (collection, category, batch DESC, pos);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS feed_state (
+    url        TEXT PRIMARY KEY,
+    state      TEXT NOT NULL,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS crawl_frontier (
+    url          TEXT PRIMARY KEY,
+    source       TEXT,
+    fetched_at   REAL NOT NULL,
+    content_hash TEXT
+);
+"""
+
+# full-text index over the summarized collection, kept in step with
+# `articles` by triggers (same transaction as the upsert). Feed text is
+# HTML, so only its visible text is indexed (visible_text is registered
+# on every connection, see get_connection).
+FTS_VERSION = 2
+
+_FTS_TEXT = """
+    visible_text(json_extract({row}.data, '$.title')),
+    visible_text(coalesce(nullif(json_extract({row}.data, '$.summary'), ''),
+                          json_extract({row}.data, '$.newspaper_summary'))),
+    visible_text(json_extract({row}.data, '$.content'))
+"""
+
+_FTS_DROP = """
+DROP TRIGGER IF EXISTS articles_fts_insert;
+DROP TRIGGER IF EXISTS articles_fts_update;
+DROP TRIGGER IF EXISTS articles_fts_delete;
+DROP TABLE IF EXISTS articles_fts;
+"""
+
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, summary, content,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles
+WHEN new.collection = '{SUMMARIZED}' BEGIN
+    INSERT INTO articles_fts (rowid, title, summary, content)
+    VALUES (new.rowid, {_FTS_TEXT.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE OF data ON articles
+WHEN new.collection = '{SUMMARIZED}' BEGIN
+    DELETE FROM articles_fts WHERE rowid = old.rowid;
+    INSERT INTO articles_fts (rowid, title, summary, content)
+    VALUES (new.rowid, {_FTS_TEXT.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles
+WHEN old.collection = '{SUMMARIZED}' BEGIN
+    DELETE FROM articles_fts WHERE rowid = old.rowid;
+END;
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def get_connection() -> sqlite3.Connection:
+    """One connection per thread; schema is created on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(NEWS_DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.create_function("visible_text", 1, visible_text, deterministic=True)
+        _local.conn = conn
+        _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        conn.commit()
+        _initialized = True
+        _import_legacy(conn)
+
+
+def _migrate(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+    if "source_hash" not in columns:
+        conn.execute("ALTER TABLE articles ADD COLUMN source_hash TEXT")
+
+    # search index missing or built by an older version: rebuild it once
+    if _meta_get(conn, "schema:fts") < FTS_VERSION:
+        conn.executescript(_FTS_DROP + FTS_SCHEMA)
+        conn.execute(
+            f"INSERT INTO articles_fts (rowid, title, summary, content) "
+            f"SELECT rowid, {_FTS_TEXT.format(row='articles')} "
+            f"FROM articles WHERE collection = ?",
+            (SUMMARIZED,),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('schema:fts', ?)",
+            (FTS_VERSION,),
+        )
+
+
+def _import_legacy(conn):
+    for collection, filename in LEGACY_FILES.items():
+        if _count(conn, collection):
+            continue
+        if not (DATA_DIR / filename).exists():
+            continue
+        try:
+            data = load_json(filename)
+        except ValueError:
+            continue
+        if data:
+            _upsert(conn, collection, data)
+            print(f"📦 Imported {len(data)} articles from {filename}")
+
+
+def article_key(article: dict):
+    """Normalized URL (or title) key, same rule as the fetcher dedupe."""
+    url = article.get("url") or article.get("title")
+    if not url:
+        return None
+    return url.strip().lower()
+
+
+def content_hash(article: dict) -> str:
+    raw = json.dumps(article, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _meta_get(conn, name):
+    row = conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def _meta_bump(conn, name):
+    conn.execute(
+        "INSERT INTO meta (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+    return _meta_get(conn, name)
+
+
+def _count(conn, collection, category=None):
+    if category is None:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM articles WHERE collection = ?", (collection,)
+        ).fetchone()
+    else:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM articles WHERE collection = ? AND category = ?",
+            (collection, category),
+        ).fetchone()
+    return row[0]
+
+
+def _upsert(conn, collection, articles, positions=None, source_hashes=None, feed_state=None):
+    now = time.time()
+    with conn:
+        batch = _meta_bump(conn, f"batch:{collection}")
+
+        rows = []
+        for pos, a in enumerate(articles):
+            key = article_key(a)
+            if not key:
+                continue
+            row_batch, row_pos = positions[pos] if positions else (batch, pos)
+            rows.append((
+                collection, key, row_batch, row_pos, a.get("category"),
+                content_hash(a), source_hashes[pos] if source_hashes else None,
+                json.dumps(a, ensure_ascii=False), now,
+            ))
+
+        # unchanged rows are skipped, new rows keep their first-seen position
+        cur = conn.executemany(
+            """
+            INSERT INTO articles
+                (collection, key, batch, pos, category, content_hash, source_hash, data, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(collection, key) DO UPDATE SET
+                category     = excluded.category,
+                content_hash = excluded.content_hash,
+                source_hash  = excluded.source_hash,
+                data         = excluded.data,
+                updated_at   = excluded.updated_at
+            WHERE articles.content_hash IS NOT excluded.content_hash
+               OR articles.source_hash IS NOT excluded.source_hash
+            """,
+            rows,
+        )
+
+        # rowcount, not total_changes: the latter also counts index writes
+        changed = cur.rowcount
+        if changed:
+            _meta_bump(conn, f"version:{collection}")
+
+        # feeds are only marked as polled once their articles are stored
+        if feed_state:
+            _write_feed_state(conn, feed_state, now)
+    return changed
+
+
+def upsert_articles(collection: str, articles, positions=None, source_hashes=None,
+                    feed_state=None) -> int:
+    """
+    Insert or update articles by normalized URL key in one transaction.
+    Returns how many rows actually changed.
+    - positions: (batch, pos) per article, to copy another collection's
+      feed order instead of appending a new batch
+    - source_hashes: content hash of the record each article was derived
+      from (see iter_changed)
+    - feed_state: {feed url: state} saved in the same transaction, so a
+      failed write never leaves entries marked as seen
+    """
+    return _upsert(get_connection(), collection, list(articles), positions, source_hashes,
+                   feed_state)
+
+
+def load_articles(collection: str, limit=None, offset=0, category=None):
+    """Newest batch first, original order inside a batch. Only the
+    requested page is read and decoded."""
+    sql = "SELECT data FROM articles WHERE collection = ?"
+    params = [collection]
+    if category is not None:
+        sql += " AND category = ?"
+        params.append(category)
+    sql += " ORDER BY batch DESC, pos ASC LIMIT ? OFFSET ?"
+    params += [-1 if limit is None else int(limit), int(offset)]
+
+    rows = get_connection().execute(sql, params)
+    return [json.loads(r[0]) for r in rows]
+
+
+_CHANGED_SQL = """
+    SELECT r.batch, r.pos, r.content_hash, r.data
+    FROM articles r
+    LEFT JOIN articles d ON d.collection = ? AND d.key = r.key
+    WHERE r.collection = ?
+      AND (d.key IS NULL OR d.source_hash IS NOT r.content_hash)
+"""
+
+
+def iter_changed(src: str, dst: str, batch_size=200):
+    """
+    Stream `src` rows that have no up-to-date derived row in `dst`
+    (new, or their content hash moved on since `dst` was written).
+    Yields lists of (article, (batch, pos), content_hash), newest first.
+    """
+    conn = get_connection()
+    order = " ORDER BY r.batch DESC, r.pos ASC LIMIT ?"
+
+    rows = conn.execute(_CHANGED_SQL + order, (dst, src, batch_size)).fetchall()
+    while rows:
+        yield [(json.loads(data), (b, p), h) for b, p, h, data in rows]
+        b, p = rows[-1][0], rows[-1][1]
+        rows = conn.execute(
+            _CHANGED_SQL + " AND (r.batch < ? OR (r.batch = ? AND r.pos > ?))" + order,
+            (dst, src, b, b, p, batch_size),
+        ).fetchall()
+
+
+def count_changed(src: str, dst: str) -> int:
+    sql = "SELECT COUNT(*) FROM (" + _CHANGED_SQL + ")"
+    return get_connection().execute(sql, (dst, src)).fetchone()[0]
+
+
+def count_articles(collection: str, category=None) -> int:
+    return _count(get_connection(), collection, category)
+
+
+def get_version(collection: str) -> int:
+    """Bumped on every write that changes the collection."""
+    return _meta_get(get_connection(), f"version:{collection}")
+
+
+# ---------------- SEARCH ----------------
+# title matches count most, then the summary, then body text
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _highlight(snippet):
+    # snippet() marks matches with control chars; escape the text first
+    # so only our <mark> tags are markup
+    return html.escape(snippet or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def fts_query(text: str) -> str:
+    """User input -> FTS5 query: every word must match (stemmed), and
+    quoting keeps operators and punctuation from being parsed."""
+    return " ".join(f'"{t}"' for t in _TERM.findall(text))
+
+
+def search_articles(text: str, limit=20, offset=0, category=None):
+    """
+    BM25-ranked search over title / summary / content of the summarized
+    collection. Returns (total, [article with "snippet"]); the snippet is
+    HTML-escaped text with matches wrapped in <mark>...</mark>.
+    """
+    match = fts_query(text)
+    if not match:
+        return 0, []
+
+    where = "articles_fts MATCH ?"
+    params = [match]
+    if category is not None:
+        where += " AND a.category = ?"
+        params.append(category)
+
+    base = f"FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid WHERE {where}"
+    conn = get_connection()
+
+    total = conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+    rows = conn.execute(
+        f"""
+        SELECT a.data,
+               snippet(articles_fts, -1, char(2), char(3), '…', 16),
+               bm25(articles_fts, ?, ?, ?) AS score
+        {base}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+        """,
+        [*SEARCH_WEIGHTS, *params, int(limit), int(offset)],
+    )
+
+    results = []
+    for data, snippet, score in rows:
+        article = json.loads(data)
+        article["snippet"] = _highlight(snippet)
+        article["score"] = round(-score, 4)  # bm25() is lower-is-better
+        results.append(article)
+    return total, results
+
+
+# ---------------- FEED STATE ----------------
+def load_feed_state() -> dict:
+    """{feed url: {"etag", "modified", "seen"}} from the last poll."""
+    rows = get_connection().execute("SELECT url, state FROM feed_state")
+    return {url: json.loads(state) for url, state in rows}
+
+
+def _write_feed_state(conn, states, now):
+    conn.executemany(
+        "INSERT OR REPLACE INTO feed_state (url, state, updated_at) VALUES (?, ?, ?)",
+        [(url, json.dumps(st), now) for url, st in states.items()],
+    )
+
+
+# ---------------- LEASES ----------------
+def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    """
+    Cross-process lock in news.db: True if `owner` now holds `name` for
+    `ttl` seconds (taking it over if the holder's lease expired). The
+    holder calls it again to renew.
+    """
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+            """,
+            (name, owner, now + ttl, now),
+        )
+        row = conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+    return row[0] == owner
+
+
+def release_lease(name: str, owner: str):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+
+# ---------------- CRAWL FRONTIER ----------------
+def frontier_due(urls, max_age: float):
+    """
+    The scraper's to-do list: `urls` that were never fetched or were last
+    fetched more than `max_age` seconds ago, in the order given.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    conn = get_connection()
+    fetched = {}
+    for i in range(0, len(urls), 500):  # stay under SQLite's variable limit
+        chunk = urls[i:i + 500]
+        marks = ",".join("?" * len(chunk))
+        fetched.update(conn.execute(
+            f"SELECT url, fetched_at FROM crawl_frontier WHERE url IN ({marks})", chunk
+        ))
+
+    cutoff = time.time() - max_age
+    return [u for u in urls if fetched.get(u, 0) < cutoff]
+
+
+def mark_crawled(url: str, source: str, text: str) -> bool:
+    """Record a fetch; True if the page is new or its text changed."""
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    conn = get_connection()
+    with conn:
+        row = conn.execute(
+            "SELECT content_hash FROM crawl_frontier WHERE url = ?", (url,)
+        ).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO crawl_frontier (url, source, fetched_at, content_hash) "
+            "VALUES (?, ?, ?, ?)",
+            (url, source, time.time(), digest),
+        )
+    return row is None or row[0] != digest
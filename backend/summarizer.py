@@ -1,24 +1,86 @@
-def categorize(article: dict) -> str:
+import os
+import re
+import json
+from bisect import bisect_right
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_model.json")
+
+
+class KeywordClassifier:
+    """
+    Keyword categories compiled into one regex.
+    Keywords only match whole words (plus a plural "s"/"es"), so "un"
+    no longer hits "under" and "ai" no longer hits "said". A keyword
+    ending in "*" is a stem and also matches derived forms ("india*" ->
+    indian, indians; "robot*" -> robotics). Categories are checked in
+    model order: the first one with a match wins.
+    """
+
+    def __init__(self, categories, default="general"):
+        self.labels = [c["name"] for c in categories]
+        self.default = default
+
+        # keyword -> rank of the first category that lists it
+        self._rank = {}
+        for rank, c in enumerate(categories):
+            for k in c["keywords"]:
+                self._rank.setdefault(k.lower(), rank)
+
+        def alternation(keys):
+            keys = sorted(keys, key=len, reverse=True)
+            return "|".join(re.escape(k.rstrip("*")) for k in keys) or "(?!)"
+
+        words = [k for k in self._rank if not k.endswith("*")]
+        stems = [k for k in self._rank if k.endswith("*")]
+        self._regex = re.compile(
+            r"\b(?:(" + alternation(words) + r")(?:e?s)?\b|(" + alternation(stems) + r")\w*)"
+        )
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            model = json.load(f)
+        return cls(model["categories"], model.get("default", "general"))
+
+    def classify_texts(self, texts):
+        """Label many texts with a single regex pass over all of them."""
+        texts = list(texts)
+        starts = []
+        pos = 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + 1
+        corpus = "\n".join(texts)
+
+        best = [None] * len(texts)
+        for m in self._regex.finditer(corpus):
+            i = bisect_right(starts, m.start()) - 1
+            rank = self._rank[m.group(1)] if m.group(1) else self._rank[m.group(2) + "*"]
+            if best[i] is None or rank < best[i]:
+                best[i] = rank
+
+        return [self.default if r is None else self.labels[r] for r in best]
+
+    def classify_batch(self, articles):
+        return self.classify_texts(_article_text(a) for a in articles)
+
+
+def _article_text(article: dict) -> str:
     title = (article.get("title") or "").lower()
     source = (article.get("source") or "").lower()
+    # newlines separate articles in the batch corpus
+    return (title + " " + source).replace("\n", " ")
+
 
-    text = title + " " + source
+classifier = KeywordClassifier.load()
 
-    sports = ["nfl", "match", "game", "score", "win", "lose", "football", "cricket"]
-    tech = ["tech", "robot", "ai", "software", "iphone", "google", "microsoft"]
-    india = ["india", "delhi", "mumbai", "bjp", "congress", "rupee"]
-    world = ["ukraine", "israel", "gaza", "china", "russia", "global", "un"]
 
-    if any(k in text for k in sports):
-        return "sports"
-    if any(k in text for k in tech):
-        return "tech"
-    if any(k in text for k in india):
-        return "india"
-    if any(k in text for k in world):
-        return "world"
+def classify_batch(articles) -> list:
+    return classifier.classify_batch(articles)
 
-    return "general"
+
+def categorize(article: dict) -> str:
+    return classifier.classify_batch([article])[0]
 
 
 def summarize_text(text: str):
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_pool import BrowserPool
+
+PAGE = """<!DOCTYPE html>
+<html><body>
+  <h1>Hello from the pool</h1>
+  <img src="/pic.png">
+  <p id="n">{n}</p>
+</body></html>
+"""
+
+
+# ---------------- LOCAL SITE ----------------
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    """Static pages on 127.0.0.1; `requested` lists every path served."""
+    root = tmp_path_factory.mktemp("site")
+    for n in range(6):
+        (root / f"page{n}.html").write_text(PAGE.format(n=n))
+    (root / "pic.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+
+    requested = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", requested
+    server.shutdown()
+
+
+class CountingPool(BrowserPool):
+    launches = 0
+
+    def _launch(self, p):
+        CountingPool.launches += 1
+        return super()._launch(p)
+
+
+@pytest.fixture
+def pool(site):
+    pytest.importorskip("playwright.sync_api")
+    pool = CountingPool(size=2, max_pages=2)
+    CountingPool.launches = 0
+    try:
+        pool.fetch(f"{site[0]}/page0.html", timeout=60)
+    except Exception as e:  # no browser binaries on this machine
+        pool.stop()
+        pytest.skip(f"chromium not available: {e}")
+    yield pool
+    pool.stop()
+
+
+# ---------------- TESTS ----------------
+def test_renders_page_without_images(pool, site):
+    base, requested = site
+    requested.clear()
+
+    html = pool.fetch(f"{base}/page1.html")
+
+    assert "Hello from the pool" in html
+    assert "/page1.html" in requested
+    assert "/pic.png" not in requested
+
+
+def test_concurrent_fetches(pool, site):
+    base, _ = site
+    urls = [f"{base}/page{n}.html" for n in range(6)]
+
+    with ThreadPoolExecutor(max_workers=6) as ex:
+        pages = list(ex.map(pool.fetch, urls))
+
+    for n, html in enumerate(pages):
+        assert f'<p id="n">{n}</p>' in html
+
+
+def test_recycles_browsers(pool, site):
+    base, _ = site
+    before = CountingPool.launches
+
+    for n in range(8):
+        pool.fetch(f"{base}/page{n % 6}.html")
+
+    # two pages per browser -> at least 3 relaunches across the two workers
+    assert CountingPool.launches - before >= 3
+
+
+def test_broken_worker_fails_jobs_instead_of_hanging():
+    class BrokenPool(BrowserPool):
+        def _serve(self, p):
+            raise RuntimeError("browser exploded")
+
+    pool = BrokenPool(size=1)
+    try:
+        with pytest.raises(Exception):
+            pool.fetch("http://127.0.0.1:9/", timeout=10)
+    finally:
+        pool.stop()
@@ -137,19 +137,23 @@ export default function Home() {
   }
 
   async function pollSummarizedNews() {
+    // wait for the run to finish, then load the feed once
     const interval = setInterval(async () => {
+      const status = await (await fetch(`${API}/summarize/status`)).json();
+      if (status.state === "queued" || status.state === "running") return;
+      clearInterval(interval);
+
       const r = await fetch(`${API}/news?limit=200`);
       const data = await r.json();
 
+      setIsSummarizing(false);
       if (data.length) {
         setNews(data);
         setTodaysPaper(buildTodaysNewspaper(data, userPrefs));
         setDisplay(data.slice(0, 10));
         setHasMore(data.length > 10);
         setIsSummarized(true);
-        setIsSummarizing(false);
         showToast("Your news is ready 🪷");
-        clearInterval(interval);
       }
     }, 2000);
   }
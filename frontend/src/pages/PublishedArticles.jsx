@@ -2,18 +2,38 @@ import { useEffect, useState } from "react";
 
 export default function PublishedArticles() {
   const [articles, setArticles] = useState([]);
+  const [fullText, setFullText] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
   const API = import.meta.env.VITE_API_URL;
 
-  useEffect(() => {
-    fetch(`${API}/blogger/articles`)
+  // newest first, one page at a time (cursor comes back in a header)
+  function loadPage(cursor) {
+    const url = cursor
+      ? `${API}/blogger/articles?cursor=${encodeURIComponent(cursor)}`
+      : `${API}/blogger/articles`;
 
+    fetch(url)
         .then(res => {
             if (!res.ok) throw new Error("Failed to fetch");
+            setNextCursor(res.headers.get("X-Next-Cursor"));
             return res.json();
         })
-        .then(data => setArticles(data))
+        .then(data => setArticles(prev => (cursor ? [...prev, ...data] : data)))
         .catch(err => console.error(err));
-    }, []);
+  }
+
+  useEffect(() => {
+    loadPage(null);
+  }, []);
+
+  // list view has no content; load it when the article is opened
+  function loadContent(id) {
+    if (fullText[id] !== undefined) return;
+    fetch(`${API}/blogger/articles/${id}`)
+      .then(res => res.json())
+      .then(a => setFullText(prev => ({ ...prev, [id]: a.content })))
+      .catch(err => console.error(err));
+  }
 
 
   return (
@@ -47,16 +67,23 @@ export default function PublishedArticles() {
 
             <p>{a.summary}</p>
 
-            <details style={{ marginTop: 10 }}>
+            <details
+              style={{ marginTop: 10 }}
+              onToggle={e => e.currentTarget.open && loadContent(a.id)}
+            >
               <summary style={{ cursor: "pointer", color: "#6366f1" }}>
                 Read full article
               </summary>
               <p style={{ marginTop: 10, whiteSpace: "pre-wrap" }}>
-                {a.content}
+                {fullText[a.id] ?? "Loading..."}
               </p>
             </details>
           </div>
         ))}
+
+        {nextCursor && (
+          <button onClick={() => loadPage(nextCursor)}>Load more</button>
+        )}
       </div>
     </div>
   );